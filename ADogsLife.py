@@ -10,21 +10,49 @@ from scene import *
 from random import *
 import random
 import math 
-import numpy
 import sound
 
-#The class of the dog, the protagonist of the game. The dog is built up of circular
-#shape nodes which are positioned relative to each other. 
-class Dog (ShapeNode):
-        def __init__(self, **kwargs):
-                ShapeNode.__init__(self, ui.Path.oval(0, 0, 20, 20), 'brown', **kwargs) 
-                self.head = ShapeNode(ui.Path.oval(0, 0, 18, 18), 'brown')
-                self.lear = ShapeNode(ui.Path.oval(0, 0, 7, 7), '#a53e11')
-                self.rear = ShapeNode(ui.Path.oval(0, 0, 7, 7), '#a53e11')
-                self.nose = ShapeNode(ui.Path.oval(0, 0, 5, 5), 'black')
-                self.tail1 = ShapeNode(ui.Path.oval(0, 0, 5, 5), 'brown')
-                self.tail2 = ShapeNode(ui.Path.oval(0, 0, 5, 5), 'brown')
-                self.tail3 = ShapeNode(ui.Path.oval(0, 0, 5, 5), 'white')
+from pawprints import PawPrintPool
+from meadow import StaticLayer, fill_oval, fill_rect
+from spatial import ViewportCuller
+from chunks import ChunkedMeadow, Decoration
+from herd import AnimalStore
+from collision import ContactTracker
+from gait import GaitTable
+from trajectory import WolfTrajectory, X_WAVES, Y_WAVES
+from profiler import FrameProfiler
+from replay import Recorder
+from shapes import SHAPES, oval, rect, texture
+from entities import Entity, EntityStore, DOG, WOLF, SHEEP
+from tweens import TweenScheduler
+from snapshot import SnapshotRing
+from lod import LevelOfDetail
+from sensors import SensorSampler
+import snapshot
+
+#The tables for the running animation of the animals, accurate to within a tenth of a point. A table with 
+#another tolerance can be put in its place, e.g. GaitTable(0.05). 
+GAIT_TABLE = GaitTable(0.1)
+
+#How an animal looks around when it stands still: the times, in seconds, at which its head is turned by 
+#the given angles from where it was. 
+LOOK_AROUND_TIMES = (0, 1, 2, 4, 6, 8, 9)
+LOOK_AROUND_ANGLES = (0, 0, -math.pi / 8, -math.pi / 8, math.pi / 8, math.pi / 8, 0)
+
+#The class of the animals of the game. An animal is built up of circular shape nodes which are 
+#positioned relative to each other, coloured after its species (see entities.py). What the animal 
+#is doing, where it is and how it moves, is kept in the components of its entity rather than in 
+#the nodes, and written to the nodes once per step by the game. 
+class Animal (ShapeNode):
+        def __init__(self, species, **kwargs):
+                ShapeNode.__init__(self, oval(20, 20), species.body, **kwargs) 
+                self.head = ShapeNode(oval(18, 18), species.head)
+                self.lear = ShapeNode(oval(7, 7), species.ears)
+                self.rear = ShapeNode(oval(7, 7), species.ears)
+                self.nose = ShapeNode(oval(5, 5), species.nose)
+                self.tail1 = ShapeNode(oval(5, 5), species.tail)
+                self.tail2 = ShapeNode(oval(5, 5), species.tail)
+                self.tail3 = ShapeNode(oval(5, 5), species.tail_tip)
                 self.add_child(self.head)
                 self.head.position = (0, 10)
                 self.add_child(self.tail1)
@@ -40,35 +68,97 @@ class Dog (ShapeNode):
                 self.rear.position = (8 * math.cos(1 * math.pi / 8), 8 * math.sin(1 * math.pi / 8))
                 self.nose.position = (10 * math.cos(2 * math.pi / 4), 10 * math.sin(2 * math.pi / 4))
                 
-                self.turn_head_status = True #This boolean controls if the dog is turning its head. 
-                
-                self.max_speed = 10
-                self.gait = 15 #Controls with which frequency paw prints are made. 
-                self.move_time = 0
-                self.radius = 10
+                self.turn_head_status = True #This boolean controls if the animal is turning its head. 
+                self.tweens = None #The tween scheduler which turns the head, given by the game. 
+
+                #The parts left out at lower levels of detail, with the node they belong to and the level from 
+                #which they are left out, see set_detail. 
+                self.detail = 0
+                self.detail_parts = [(self.lear, self.head, 1), (self.rear, self.head, 1), (self.nose, self.head, 1), 
+                        (self.tail1, self, 2), (self.tail2, self, 2), (self.tail3, self, 2)]
+
+                self.entity = Entity(species, self, GAIT_TABLE.offsets(0))
+                self.transform = self.entity.transform
+                self.kinematics = self.entity.kinematics
+                self.tracks = self.entity.tracks
+                self.herd = None #The animal store the animal is moved by, if any, and its row there, see herd.py. 
+                self.herd_index = None
+
+        @property
+        def max_speed(self):
+                return self.kinematics.max_speed
+
+        @property
+        def gait(self):
+                return self.tracks.gait
+
+        @property
+        def radius(self):
+                return self.tracks.radius
+
+        @property
+        def move_time(self):
+                return self.entity.gait.move_time
+
+        @move_time.setter
+        def move_time(self, t):
+                self.entity.gait.move_time = t
+
+        #Puts the animal at (x, y), and turns it to the given rotation if there is one. An animal moved by 
+        #an animal store is put there in the store as well, or the store would move it back. 
+        def place(self, x, y, rotation = None):
+                self.entity.place(x, y, rotation)
+                if self.herd is not None:
+                        self.herd.place(self.herd_index, x, y)
         
-        #This method returns the paw print of the dog. Each animal in the game (so far there are only dogs and wolves)
-        #have their own paw print, which they leave in their wake as they move forward. 
-        def paw_print(self):
-                paw = ShapeNode(ui.Path.oval(0, 0, 5, 5), 'black') 
-                toes = []       
+        #The number of nodes the animal is drawn with at each level of detail, see lod.py. 
+        DETAIL_NODES = (8, 5, 2)
+
+        #Draws the animal with less detail: without its ears and nose from level 1, and without its tail as 
+        #well from level 2. The parts left out keep being animated, so they are as they should be when they 
+        #are put back. 
+        def set_detail(self, level):
+                for part, parent, least in self.detail_parts:
+                        if level >= least:
+                                part.remove_from_parent()
+                        elif part.parent is None:
+                                parent.add_child(part)
+                self.detail = level
+
+        #This method returns the paw print of the animal, which it leaves in its wake as it moves forward. 
+        def paw_print(self, detail = 0):
+                return SpriteNode(self.paw_texture(detail))
+
+        #The shared texture of the paw print at the given level of detail (see lod.py). From level 1 on, 
+        #the paw print is just the pad, without the toes. The paw print pool puts it on recycled prints. 
+        def paw_texture(self, detail = 0):
+                if detail >= 1:
+                        return texture('paw pad', 6, 6, Animal.draw_pad)
+                return texture('paw', 12, 12, Animal.draw_paw)
+
+        #Draws the paw print, a pad with three toes, centred on (x, y), for the shared paw print texture 
+        #(see shapes.py). It replaces a shape node per pad and toe. 
+        @staticmethod
+        def draw_paw(x, y):
+                fill_oval(x, y, 5, 5, 'black')
                 for i in range(3):
-                        toes.append(ShapeNode(ui.Path.oval(0, 0, 2.5, 2.5), 'black'))
-                        paw.add_child(toes[i])
-                        toes[i].position = (5 * math.cos((2 + i) * math.pi / 6), 5 * math.sin((2 + i) * math.pi / 6))
-                return paw
+                        fill_oval(x + 5 * math.cos((2 + i) * math.pi / 6), y - 5 * math.sin((2 + i) * math.pi / 6), 2.5, 2.5, 'black')
+
+        @staticmethod
+        def draw_pad(x, y):
+                fill_oval(x, y, 5, 5, 'black')
         
-        #This method controls the turning of the dog's head. The dog looks around when sitting still. In a future version, 
-        #where the dog is looking will indicate the location of a wolf. 
+        #This method controls the turning of the animal's head. The dog looks around when sitting still. In a future version, 
+        #where the dog is looking will indicate the location of a wolf. The head is turned by the game's tween 
+        #scheduler (see tweens.py): it waits a second, looks right, waits, looks left, waits and looks ahead again. 
         def turn_head(self, velocity):
-                actions = [Action.wait(1), Action.rotate_by(-math.pi / 8, 1), Action.wait(2), Action.rotate_by(math.pi / 4, 2), Action.wait(2), Action.rotate_by(-math.pi / 8, 1), Action.call(self.change_turn_head)]
-
                 if velocity < 0.05:
                         if self.turn_head_status:
                                 self.turn_head_status = False   
-                                self.head.run_action(Action.sequence(actions), 'turn_head')
-                else:
-                        self.head.remove_action('turn_head')
+                                r = self.head.rotation
+                                self.tweens.run(self.head, 'turn_head', 'rotation', LOOK_AROUND_TIMES, [r + a for a in LOOK_AROUND_ANGLES], self.tweens_time(), self.change_turn_head)
+                elif not self.turn_head_status or self.tweens.running(self.head, 'turn_head'):
+                        self.tweens.cancel(self.head, 'turn_head')
                         self.head.rotation = 0
                         self.turn_head_status = True    
 
@@ -78,25 +168,37 @@ class Dog (ShapeNode):
                 else:
                         self.turn_head_status = True    
 
-        #This method calculates the velocity of the dog based on the input, which is given by the 
-        #position of the iPhone, making sure that the dog does not exceed its maximum velocity. 
+        #The time of the scene the animal is in, which the tweens run on. 
+        def tweens_time(self):
+                scene = self.scene
+                return scene.t if scene is not None else 0.0
+
+        #This method calculates the velocity of the animal based on the input, which is given by the 
+        #position of the iPhone, making sure that the animal does not exceed its maximum velocity. 
+        #The velocity, and the input which drives the running animation, are kept for the step. 
         def velocity(self, u, v):
+                max_speed = self.kinematics.max_speed
                 if abs(u) > 0.05:
                         if abs(u) < 1:
-                                U = u * self.max_speed
+                                U = u * max_speed
                         else:
-                                U = (u / abs(u)) * self.max_speed 
+                                U = (u / abs(u)) * max_speed 
                 else: 
                         U = 0
 
                 if abs(v) > 0.05:
                         if abs(v) < 1:
-                                V = v * self.max_speed
+                                V = v * max_speed
                         else:
-                                V = (v / abs(v)) * self.max_speed
+                                V = (v / abs(v)) * max_speed
                 else:
                         V = 0  
 
+                k = self.kinematics
+                k.vx = U
+                k.vy = V
+                k.u = u
+                k.v = v
                 return [U, V]
         
         #This method calculates the speed given the velocity. 
@@ -106,344 +208,573 @@ class Dog (ShapeNode):
                 speed = math.sqrt(u * u + v * v)
                 return speed
         
-        #This method controls the animation of the dog when its moving. As the dog runs faster,
+        #This method controls the animation of the animal when its moving. As the animal runs faster,
         #it stretches out, and the various body parts increase and decrease in size in a periodic 
-        #fashion, to simulate the effect of the dog moving up and down. It also sees to that
-        #the body parts are properly aligned with the direction of movement. 
+        #fashion, to simulate the effect of the animal moving up and down. It also sees to that
+        #the body parts are properly aligned with the direction of movement. The game animates all 
+        #its animals at once in the same way, see EntityStore.animate. 
         def move(self, u, v):
-                t = self.move_time
-                ang = numpy.angle(numpy.complex(u, v))
-                vel = min(math.sqrt(u * u + v * v), 0.7)
-
-                if abs(u) > 0.05 or abs(v) > 0.05:
-                        f = 2 - vel
-                        t += 1
-                        r_1 = 20 + (1 + vel) * math.sin(f * t / 10)
-                        r_2 = 20 + (1 + vel) * math.sin(f * (t + 10) / 10)
-                        r_3 = 7 * r_2 / 20
-                        r_4 = 5 * r_2 / 20
-                        r_5 = 7 + (0.25 + 0.5 * vel) * math.sin(f * (t - 10) / 5)
-                        r_6 = 7 + (1 + vel) * math.sin(f * (t - 20) / 5)
-                        r_7 = 7 + (1 + vel) * math.sin(f * (t - 30) / 5)
-                        self.size = (r_1, r_1)
-                        self.head.size = (r_2, r_2)
-                        self.lear.size = (r_3, r_3)
-                        self.rear.size = (r_3, r_3)
-                        self.nose.size = (r_4, r_4)
-                        self.tail1.size = (r_5, r_5)
-                        self.tail2.size = (r_6, r_6)
-                        self.tail3.size = (r_7, r_7)
-                        self.rotation = ang - math.pi / 2 
-                        self.move_time = t 
-                        self.head.position = (0, 10 + 13 * vel)
-                        self.tail1.position = (self.tail1.position.x, -9 - 5 * vel )
-                        self.tail2.position = (self.tail2.position.x, -13 - 10 * vel)
-                        self.tail3.position = (self.tail3.position.x, -17 - 15 * vel)
+                self.kinematics.u = u
+                self.kinematics.v = v
+                self.entity.animate(GAIT_TABLE)
         
-        #Being a happy dog, it always wags its tail. In a future version, the dog will cease
+        #Being a happy dog, the dog always wags its tail. In a future version, the dog will cease
         #wagging a tail when it senses the presence of a wolf. 
         def wag_tail(self, t):
-                self.tail1.position = (math.sin(0.1 * t), self.tail1.position.y)
-                self.tail2.position = (3 * math.sin(0.1 * t - 1), self.tail2.position.y)
-                self.tail3.position = (6 * math.sin(0.1 * t - 2), self.tail3.position.y) 
+                self.entity.wag(GAIT_TABLE, t)
+
+#The class of the dog, the protagonist of the game. 
+class Dog (Animal):
+        def __init__(self, **kwargs):
+                Animal.__init__(self, DOG, **kwargs)
 
 #The class for the wolf, the dog's antagonist. It is very similar to the dog class, with the main exception that 
 #the wolf has an additional velocity method, which allows it to move automatically across the screen in a 
 #seemingly random fashion. The wolf also has a counter attached to it, which keeps track of how often 
 #it has been attacked by the dog (more accurately, how much life it has still got). 
-class Wolf (ShapeNode):
+class Wolf (Animal):
         def __init__(self, **kwargs):
-                ShapeNode.__init__(self, ui.Path.oval(0, 0, 20, 20), 'gray', **kwargs) 
-                self.head = ShapeNode(ui.Path.oval(0, 0, 18, 18), 'gray')
-                self.lear = ShapeNode(ui.Path.oval(0, 0, 7, 7), '#b3b3b3')
-                self.rear = ShapeNode(ui.Path.oval(0, 0, 7, 7), '#b3b3b3')
-                self.nose = ShapeNode(ui.Path.oval(0, 0, 5, 5), 'black')
-                self.tail1 = ShapeNode(ui.Path.oval(0, 0, 5, 5), 'gray')
-                self.tail2 = ShapeNode(ui.Path.oval(0, 0, 5, 5), 'gray')
-                self.tail3 = ShapeNode(ui.Path.oval(0, 0, 5, 5), 'white')
-                self.add_child(self.head)
-                self.head.position = (0, 10)
-                self.add_child(self.tail1)
-                self.add_child(self.tail2)
-                self.add_child(self.tail3)
-                self.tail1.position = (0, -9)
-                self.tail2.position = (0, -13)
-                self.tail3.position = (0, -17)
-                self.head.add_child(self.lear)
-                self.head.add_child(self.rear)
-                self.head.add_child(self.nose)
-                self.lear.position = (8 * math.cos(7 * math.pi / 8), 8 * math.sin(7 * math.pi / 8))
-                self.rear.position = (8 * math.cos(1 * math.pi / 8), 8 * math.sin(1 * math.pi / 8))
-                self.nose.position = (10 * math.cos(2 * math.pi / 4), 10 * math.sin(2 * math.pi / 4))
-                
-                self.turn_head_status = True
-                
-                self.max_speed = 7
-                self.gait = 15
+                Animal.__init__(self, WOLF, **kwargs)
                 self.time = 0
-                self.move_time = 0
-                self.radius = 10
+                self.step_length = 1 #The length of a step of its time counter, in sixtieths of a second. 
+                self.x_waves = X_WAVES #The amplitudes and periods of the wolf's velocity, see trajectory.py. 
+                self.y_waves = Y_WAVES
                 self.speed_x = 0
                 self.speed_y = 0
-                self.relative_speed_x = self.speed_x / self.max_speed
-                self.relative_speed_y = self.speed_y / self.max_speed
-                self.health = 100
 
                 self.health_font = ('Futura',15)
-                self.health_label = LabelNode('100', self.health_font, parent=self, color = 'black')
-                #self.add_child(self.health_label)
+                self.health_label = LabelNode(str(self.health), self.health_font, parent=self, color = 'black')
                 self.health_label.position = (20, 20)
-        
-        #Just like the dog, the wolf leaves paw prints. 
-        def paw_print(self):
-                paw = ShapeNode(ui.Path.oval(0, 0, 5, 5), 'black') 
-                toes = []       
-                for i in range(3):
-                        toes.append(ShapeNode(ui.Path.oval(0, 0, 2.5, 2.5), 'black'))
-                        paw.add_child(toes[i])
-                        toes[i].position = (5 * math.cos((2 + i) * math.pi / 6), 5 * math.sin((2 + i) * math.pi / 6))
-                return paw
-        
-        #The wolf also has a method for turning its head. In practice, this does not happen when the automatic 
-        #velocity method is used for the wolf however, as it does not come to a stand-still. 
-        def turn_head(self, velocity):
-                actions = [Action.wait(1), Action.rotate_by(-math.pi / 8, 1), Action.wait(2), Action.rotate_by(math.pi / 4, 2), Action.wait(2), Action.rotate_by(-math.pi / 8, 1), Action.call(self.change_turn_head)]
+                self.entity.health.label = self.health_label
 
-                if velocity < 0.05:
-                        if self.turn_head_status:
-                                self.turn_head_status = False   
-                                self.head.run_action(Action.sequence(actions), 'turn_head')
-                else:
-                        self.head.remove_action('turn_head')
-                        self.head.rotation = 0
-                        self.turn_head_status = True    
+        DETAIL_NODES = (9, 6, 3) #With the health label, which is always shown. 
 
-        def change_turn_head(self):
-                if self.turn_head_status:
-                        self.turn_head_status = False
-                else:
-                        self.turn_head_status = True    
+        @property
+        def health(self):
+                return self.entity.health.value
+
+        @health.setter
+        def health(self, value):
+                self.entity.health.value = value
         
         #This method allows the wolf to move automatically. It moves according to the sum of to trigonometric 
         #functions with different periodicity and amplitude in order to achieve a smooth moving pattern which 
         #appears semi-random. The parameters have been determined through trial and error. 
         def velocity(self, u, v):
-                t = self.time
-                self.speed_x =  -5 * math.sin(t * 2 * math.pi / 700) + 2 * math.sin(t * 2 * math.pi / 400)
+                t = self.time * self.step_length
+                speed_x = 0
+                for amplitude, period in self.x_waves:
+                        speed_x += amplitude * math.sin(t * 2 * math.pi / period)
+                speed_y = 0
+                for amplitude, period in self.y_waves:
+                        speed_y += amplitude * math.cos(t * 2 * math.pi / period)
+                self.speed_x = speed_x
+                self.speed_y = speed_y
 
-                self.speed_y = -5 * math.cos(t * 2 * math.pi / 2300) + 3 * math.cos(t * 2 * math.pi / 400)
-
-                t += 1
-                self.time = t
-
-                self.relative_speed_x = self.speed_x / self.max_speed
-                self.relative_speed_y = self.speed_y / self.max_speed
+                self.time += 1
 
-                U = self.speed_x 
-                V = self.speed_y 
+                return self.drive(self.speed_x, self.speed_y)
 
+        #Keeps the velocity of the wolf for the step, and the same relative to its top speed for its animation. 
+        def drive(self, U, V):
+                k = self.kinematics
+                k.vx = U
+                k.vy = V
+                k.u = U / k.max_speed
+                k.v = V / k.max_speed
                 return [U, V]
 
+        #Returns the path the wolf will follow from where it is now, worked out in closed form (see 
+        #trajectory.py). With a bound, the wolf is held within it, like on the field. 
+        def trajectory(self, bound = None):
+                return WolfTrajectory(self.transform.x, self.transform.y, self.time, bound, x_waves = self.x_waves, y_waves = self.y_waves, step_length = self.step_length)
+
+        #Moves the wolf to where it is after the given number of frames along a path from the method above, 
+        #without going through the frames in between. Without a bound, frames may be negative, to move the 
+        #wolf backwards; a bounded path raises ValueError for them, and rewinding it takes a path built from 
+        #an earlier state of the wolf. 
+        def seek(self, path, frames):
+                x, y = path.position(frames)
+                self.place(x, y)
+                self.time = path.start + frames
+                self.speed_x, self.speed_y = path.velocity(frames - 1)
+                U, V = self.drive(self.speed_x, self.speed_y)
+                if self.herd is not None:
+                        k = self.kinematics
+                        self.herd.drive(self.herd_index, (U, V), k.u, k.v)
+
         #The wolf also has a manual velocity method, making it possible to play as the wolf instead
         #(it is mostly used for testing purposes though). 
         def velocity_manual(self, u, v):
-                if abs(u) > 0.05:
-                        if abs(u) < 1:
-                                U = u * self.max_speed
-                        else:
-                                U = (u / abs(u)) * self.max_speed 
-                else: 
-                        U = 0
-
-                if abs(v) > 0.05:
-                        if abs(v) < 1:
-                                V = v * self.max_speed
-                        else:
-                                V = (v / abs(v)) * self.max_speed
-                else:
-                        V = 0  
-
-                return [U, V]
-
-        #Calculates the speed given the velocity. 
-        def speed(self, velocity):
-                u = velocity[0]
-                v = velocity[1]
-                speed = math.sqrt(u * u + v * v)
-                return speed
-
-        #Just as for the dog, this method controls the animation of the wolf as it moves, trying 
-        #to make its movements look somewhat dynamic. 
-        def move(self, u, v):
-                t = self.move_time
-                ang = numpy.angle(numpy.complex(u, v))
-                vel = min(math.sqrt(u * u + v * v), 0.7)
-
-                if abs(u) > 0.05 or abs(v) > 0.05:
-                        f = 2 - vel
-                        t += 1
-                        r_1 = 20 + (1 + vel) * math.sin(f * t / 10)
-                        r_2 = 20 + (1 + vel) * math.sin(f * (t + 10) / 10)
-                        r_3 = 7 * r_2 / 20
-                        r_4 = 5 * r_2 / 20
-                        r_5 = 7 + (0.25 + 0.5 * vel) * math.sin(f * (t - 10) / 5)
-                        r_6 = 7 + (1 + vel) * math.sin(f * (t - 20) / 5)
-                        r_7 = 7 + (1 + vel) * math.sin(f * (t - 30) / 5)
-                        self.size = (r_1, r_1)
-                        self.head.size = (r_2, r_2)
-                        self.lear.size = (r_3, r_3)
-                        self.rear.size = (r_3, r_3)
-                        self.nose.size = (r_4, r_4)
-                        self.tail1.size = (r_5, r_5)
-                        self.tail2.size = (r_6, r_6)
-                        self.tail3.size = (r_7, r_7)
-                        self.rotation = ang - math.pi / 2 
-                        self.move_time = t 
-                        self.head.position = (0, 10 + 13 * vel)
-                        self.tail1.position = (self.tail1.position.x, -9 - 5 * vel )
-                        self.tail2.position = (self.tail2.position.x, -13 - 10 * vel)
-                        self.tail3.position = (self.tail3.position.x, -17 - 15 * vel)
-                        self.health_label.rotation = math.pi / 2 - ang
-
-        #The wolf can also wag its tail. 
-        def wag_tail(self, t):
-                self.tail1.position = (math.sin(0.1 * t), self.tail1.position.y)
-                self.tail2.position = (3 * math.sin(0.1 * t - 1), self.tail2.position.y)
-                self.tail3.position = (6 * math.sin(0.1 * t - 2), self.tail3.position.y) 
+                return Animal.velocity(self, u, v)
 
 #A primitive class for the flowers on the meadow. This has practically been replaced by the 
 #updated flower class below. 
 class Flower (ShapeNode):
         def __init__(self, **kwargs):
-                ShapeNode.__init__(self, ui.Path.oval(0, 0, 10, 10), 'pink', **kwargs) 
-                self.cen = ShapeNode(ui.Path.oval(0, 0, 3, 3), 'yellow')
+                ShapeNode.__init__(self, oval(10, 10), 'pink', **kwargs) 
+                self.cen = ShapeNode(oval(3, 3), 'yellow')
                 self.add_child(self.cen)
 
 #The class for the flowers on the meadow. These are built out of shape nodes. Each flower has 
 #a yellow centre and five white petals. 
 class Flower2 (ShapeNode):
         def __init__(self, **kwargs):
-                ShapeNode.__init__(self, ui.Path.oval(0, 0, 5, 5), 'black', **kwargs) 
+                ShapeNode.__init__(self, oval(5, 5), 'black', **kwargs) 
 
                 self.z_position = 0.5
 
                 petals = []
 
                 for i in range(5):
-                        petals.append(ShapeNode(ui.Path.oval(0, 0, 5,5), 'white'))
+                        petals.append(ShapeNode(oval(5, 5), 'white'))
                         self.add_child(petals[i])
                         petals[i].position = (2.5 * math.cos(2 * math.pi * i / 5), 2.5 * math.sin(2 * math.pi * i / 5))
 
-                cen = ShapeNode(ui.Path.oval(0, 0, 5,5), 'yellow')
+                cen = ShapeNode(oval(5, 5), 'yellow')
                 self.add_child(cen)
 
+                self.petals = petals
+                self.cen = cen
+                self.detail = 0
+
+        #The number of nodes the flower is drawn with at each level of detail, see lod.py. 
+        DETAIL_NODES = (7, 2, 1)
+
+        #Draws the flower with less detail: as its yellow centre alone at level 1, and as a single white 
+        #dot at level 2. The parts are put back in their order, with the centre on top of the petals. 
+        def set_detail(self, level):
+                for node in self.petals + [self.cen]:
+                        node.remove_from_parent()
+                if level < 1:
+                        for petal in self.petals:
+                                self.add_child(petal)
+                if level < 2:
+                        self.add_child(self.cen)
+                self.fill_color = 'black' if level < 2 else 'white'
+                self.detail = level
+
+        #Draws the same flower into an image, centred on (x, y), for the baked meadow (see meadow.py). 
+        #The y axis of images points down, so the petals are mirrored compared to above. 
+        @staticmethod
+        def draw(x, y):
+                fill_oval(x, y, 5, 5, 'black')
+                for i in range(5):
+                        fill_oval(x + 2.5 * math.cos(2 * math.pi * i / 5), y - 2.5 * math.sin(2 * math.pi * i / 5), 5, 5, 'white')
+                fill_oval(x, y, 5, 5, 'yellow')
+
 #The class for the trees making the forest around the meadow, which function as the the bound for 
 #the game area. 
 class Tree (ShapeNode):
         def __init__(self, **kwargs):
-                ShapeNode.__init__(self, ui.Path.oval(0, 0, 150, 150), '#006900', **kwargs) 
+                ShapeNode.__init__(self, oval(150, 150), '#006900', **kwargs) 
+
+        @staticmethod
+        def draw(x, y):
+                fill_oval(x, y, 150, 150, '#006900')
 
 #The class taking care of the actual runnning of the game.                 
 class Game (Scene):
+        FIELD_SIZE = 600
+        FLOWER_COUNT = 200
+        TREE_COUNT = 200
+        MAX_PAW_PRINTS = 200 #The number of paw prints that can be visible at the same time. 
+        PAW_PRINT_FADE_TIME = 1.5
+        BAKE_STATIC = True #Draws the meadow into a few images instead of keeping a node per flower and tree. 
+        TILE_SIZE = 256
+        TILE_SCALE = None #Pixels per point of the images of the meadow, None for those of the screen. E.g. 1 where memory is short. 
+        CULL_DECORATIONS = True #Only keeps the parts of the meadow near the screen in the scene. 
+        CULL_CELL_SIZE = 256
+        CULL_MARGIN = 100
+        INFINITE_MEADOW = False #An endless meadow without the forest around it, generated as the dog explores it. 
+        MEADOW_SEED = None #The seed of the endless meadow, a random one if None. 
+        CHUNK_SIZE = 512
+        FLOWERS_PER_CHUNK = 36
+        TREES_PER_CHUNK = 1
+        MAX_CHUNKS = 16
+        HERD_SIZE = 0 #The number of sheep on the meadow. 
+        VECTORIZED_ANIMALS = False #Moves and animates the dog and the wolf together with the sheep, see herd.py. 
+        PROFILE = False #Times every phase of the update loop, and shows the slowest ones on the screen, see profiler.py. 
+        SEED = None #The seed of the random numbers used to set the game up, a random one if None. 
+        RECORD = None #The path of a file to record the game to, see replay.py. 
+        FIXED_STEP = True #Runs the game in steps of fixed length, however often the screen is redrawn. 
+        STEP_RATE = 60 #The number of steps per second. The speeds in the game are per sixtieth of a second, whatever the rate. 
+        MAX_STEPS = 4 #The most steps taken in one frame, after which a slow device falls behind. 
+        INTERPOLATE = True #Draws the animals and the camera in between the last two steps. 
+        SNAPSHOT_INTERVAL = None #Seconds between snapshots of the game, for rewinding it, see snapshot.py. None for none. 
+        SNAPSHOT_HISTORY = 10 #The number of snapshots kept. 
+        SNAPSHOT_PATH = None #A file the last snapshot is also written to, for resuming the game after a crash. 
+        LEVEL_OF_DETAIL = True #Draws the animals, flowers and paw prints far from the middle of the screen with fewer nodes, see lod.py. 
+        LOD_DISTANCES = (250, 450) #The distances from the middle of the screen beyond which less detail is drawn. 
+        LOD_NODE_BUDGET = 400 #The most nodes the animals and flowers may be drawn with, or None for no limit. 
+        LOD_SCALE = 1.0 #How much smaller than normal things look on the screen, e.g. 2 when zoomed out twice. 
+        LOD_INTERVAL = 10 #The number of frames between choosing the levels of detail. 
+        SENSOR_THREAD = True #Reads the motion sensor on a background thread rather than in update, see sensors.py. 
+        SENSOR_RATE = 100 #The number of times per second the sensor is read on that thread. 
+        SENSOR_FILTER = 'one_euro' #How the readings are smoothed: 'one_euro', 'low_pass' or None. 
+        SENSOR_FILTER_OPTIONS = {} #E.g. {'min_cutoff': 0.5, 'beta': 2.0} for the one-euro filter. 
+        ADAPTIVE_CALIBRATION = True #Lets the neutral position of the phone follow it while the dog stands still. 
+        CALIBRATION_RATE = 0.01 #How far the neutral position moves towards the phone in a sixtieth of a second. 
+
         def setup(self):
+                #Everything random about the game comes from this seed, so that it can be recorded and replayed. 
+                self.seed = self.SEED if self.SEED is not None else random.randrange(2 ** 32)
+                random.seed(self.seed)
+
                 self.background_color = 'green'
-                self.time = 0
+                self.time = 0 #The number of steps taken. 
+                #The length of a step in sixtieths of a second, which the speeds and the rhythms of the game are 
+                #given in, so that it plays the same at any step rate. 
+                self.step_length = 60.0 / self.STEP_RATE
+                #The calibration rate compounded over a step. 
+                self.calibration_rate = self.CALIBRATION_RATE
+                if self.step_length != 1:
+                        self.calibration_rate = 1 - (1 - self.CALIBRATION_RATE) ** self.step_length
                 self.gx = 0
                 self.gy = 0
                 self.factor_x = 1
                 self.factor_y = 1
+                self.calibrated = False #Whether the neutral position of the phone is known, see set_position. 
+
+                #The motion sensor, read and smoothed on a thread of its own, see sensors.py. 
+                self.sensor = SensorSampler(rate = self.SENSOR_RATE, smoothing = self.SENSOR_FILTER, **self.SENSOR_FILTER_OPTIONS)
+                if self.SENSOR_THREAD:
+                        self.sensor.start()
                 self.move_time = 0
-                self.FIELD_SIZE = 600
 
                 health_font = ('Futura',15)
 
                 self.dog = Dog(parent=self)
-                self.dog.position = (self.size.w / 2, self.size.h / 2)
+                self.dog.place(self.size.w / 2, self.size.h / 2)
                 self.dog.z_position = 1 #The dog's animation takes priority over that of the wolf when they collide. 
 
                 self.wolf = Wolf(parent=self)
-                self.wolf.position = (self.size.w / 2, self.size.h / 2 - 30)
+                self.wolf.place(self.size.w / 2, self.size.h / 2 - 30)
                 self.wolf.z_position = 0.9
+                self.wolf.step_length = self.step_length
+
+                #The animals whose velocities are sampled every frame, see sample_input below. Their 
+                #entities are moved, animated and written to their nodes by the entity store. 
+                self.animals = [self.wolf, self.dog]
+                self.input_velocity = [0, 0]
+                self.input_speed = 0
+                self.entities = EntityStore()
+                for animal in self.animals:
+                        self.entities.add(animal.entity)
+
+                #The sheep, and with VECTORIZED_ANIMALS also the dog and the wolf, are moved and animated 
+                #all at once by the animal store. 
+                self.herd = AnimalStore(self, max(16, self.HERD_SIZE + 2))
+                self.sheep_list = []
+                for i in range(self.HERD_SIZE):
+                        sheep = Animal(SHEEP, parent=self)
+                        x = random.uniform(-self.FIELD_SIZE, self.FIELD_SIZE)
+                        y = random.uniform(-self.FIELD_SIZE, self.FIELD_SIZE)
+                        sheep.place(x, y)
+                        sheep.z_position = 0.8
+                        self.herd.add(sheep, wanders = True, culled = True, phase = random.uniform(0, 64400))
+                        self.sheep_list.append(sheep)
+                if self.VECTORIZED_ANIMALS:
+                        self.herd.add(self.wolf, health = self.wolf.health)
+                        self.herd.add(self.dog, wags = True)
+
+                #Contacts between the animals, see collision.py. 
+                self.contacts = ContactTracker()
+
+                #The fading of paw prints and the turning of heads are all run by one tween scheduler, see tweens.py. 
+                self.tweens = TweenScheduler()
+                for animal in self.animals:
+                        animal.tweens = self.tweens
+
+                #Paw prints are recycled once they have faded, see pawprints.py. 
+                self.paw_pool = PawPrintPool(self, self.MAX_PAW_PRINTS, self.PAW_PRINT_FADE_TIME, self.tweens)
+                #How far the screen can move, following the dog, while a paw print fades, in points. 
+                self.paw_print_reach = self.PAW_PRINT_FADE_TIME * 60 * self.dog.kinematics.max_speed
+
+                #The levels of detail of the animals, and of the flowers if they are nodes, see lod.py. 
+                self.lod = None
+                self.detail_frames = 0
+                if self.LEVEL_OF_DETAIL:
+                        self.lod = LevelOfDetail(self.LOD_DISTANCES, self.LOD_NODE_BUDGET)
+                        for animal in [self.dog, self.wolf] + self.sheep_list:
+                                self.lod.add(animal)
 
                 self.flower_list = []
                 self.tree_list = []
-
-                #We place 200 flowers randomly on the meadow. 
-                for i in range(200):
-                        self.flower_list.append(Flower2(parent=self))
-                        self.flower_list[i].position = (random.randint(-self.FIELD_SIZE, self.FIELD_SIZE), random.randint(-self.FIELD_SIZE, self.FIELD_SIZE))
-                
-                #The following four blocks of code make up the boundary of the forest, to make sure it has no
-                #holes in it, as the tress below are placed randomly, which could result in patches of grass 
-                #at the forest boundary otherwise. 
-                forest_right = ShapeNode(ui.Path.rect(0, 0, 300, 2 * (self.FIELD_SIZE + self.size.h / 3)), '#006900')
-                self.add_child(forest_right)
-                forest_right.position = (self.FIELD_SIZE + 150, 0)
-                forest_right.z_position = 2
-
-                forest_left = ShapeNode(ui.Path.rect(0, 0, 300, 2 * (self.FIELD_SIZE + self.size.h / 3)), '#006900')
-                self.add_child(forest_left)
-                forest_left.position = (- (self.FIELD_SIZE + 150), 0)
-                forest_left.z_position = 2
-
-                forest_up = ShapeNode(ui.Path.rect(0, 0, 2 * self.FIELD_SIZE, 300), '#006900')
-                self.add_child(forest_up)
-                forest_up.position = (0, self.FIELD_SIZE + 150)
-                forest_up.z_position = 2
-
-                forest_down = ShapeNode(ui.Path.rect(0, 0, 2 * self.FIELD_SIZE, 300), '#006900')
-                self.add_child(forest_down)
-                forest_down.position = (0, -(self.FIELD_SIZE + 150))
-                forest_down.z_position = 2
-        
-                #One hundred trees are placed randomly on the sides of the meadow. 
-                for i in range(100):
-                        self.tree_list.append(Tree(parent=self))
-                        x = random.choice([-self.FIELD_SIZE, self.FIELD_SIZE])
-                        self.tree_list[i].position = (x + (x / abs(x)) * random.randint(-50, 0), random.randint(-self.FIELD_SIZE, self.FIELD_SIZE)) 
-                        self.tree_list[i].z_position = 2
-                
-                #One hundred trees are placed randomly above and below the meadow. 
-                for i in range(100, 200):
-                        self.tree_list.append(Tree(parent=self))
-                        y = random.choice([-self.FIELD_SIZE, self.FIELD_SIZE])
-                        self.tree_list[i].position = (random.randint(-self.FIELD_SIZE, self.FIELD_SIZE), y + (y / abs(y)) * random.randint(-50, 0))
-                        self.tree_list[i].z_position = 2 
+                self.forest_list = []
+                self.meadow_layers = []
+                self.culler = None
+                self.chunks = None
+                if self.INFINITE_MEADOW:
+                        self.chunk_meadow()
+                else:
+                        self.place_meadow()
+
+                self.recorder = None
+                self.replay = None
+                if self.RECORD is not None:
+                        Recorder(self.RECORD).attach(self)
+
+                #The game time not yet simulated, in steps. The first frame takes a step straight away. 
+                self.accumulator = 1.0
+                self.smoothed_nodes = [self, self.dog, self.wolf] #The sheep are drawn in between steps by the herd. 
+                self.previous_positions = None
+                self.current_positions = None
+                self.previous_herd = None
+
+                self.snapshots = None
+                self.last_snapshot = 0.0
+                if self.SNAPSHOT_INTERVAL is not None:
+                        self.snapshots = SnapshotRing(len(self.sheep_list), self.SNAPSHOT_HISTORY)
+
+                self.profiler = None
+                if self.PROFILE:
+                        self.profiler = FrameProfiler()
+                        self.profiler.attach(self)
+                        self.profiler.show_overlay()
+
+        #This method places the flowers and the trees of the meadow, surrounded by the forest. 
+        def place_meadow(self):
+                #We place the flowers (two hundred of them by default) randomly on the meadow. 
+                S = self.FIELD_SIZE
+                self.flower_positions = [(random.randint(-S, S), random.randint(-S, S)) for i in range(self.FLOWER_COUNT)]
+
+                #The following four rectangles, given by their centre and size, make up the boundary of the forest, 
+                #to make sure it has no holes in it, as the tress below are placed randomly, which could result in 
+                #patches of grass at the forest boundary otherwise. 
+                self.forest_rects = [
+                        (S + 150, 0, 300, 2 * (S + self.size.h / 3)),
+                        (- (S + 150), 0, 300, 2 * (S + self.size.h / 3)),
+                        (0, S + 150, 2 * S, 300),
+                        (0, -(S + 150), 2 * S, 300)]
+
+                #Half of the trees are placed randomly on the sides of the meadow, and the other half 
+                #randomly above and below it. 
+                self.tree_positions = []
+                for i in range(self.TREE_COUNT // 2):
+                        x = random.choice([-S, S])
+                        self.tree_positions.append((x + (x / abs(x)) * random.randint(-50, 0), random.randint(-S, S)))
+                for i in range(self.TREE_COUNT // 2, self.TREE_COUNT):
+                        y = random.choice([-S, S])
+                        self.tree_positions.append((random.randint(-S, S), y + (y / abs(y)) * random.randint(-50, 0)))
+
+                if self.BAKE_STATIC:
+                        self.bake_meadow()
+                else:
+                        self.build_meadow()
+
+                if self.CULL_DECORATIONS:
+                        self.cull_meadow()
+
+        #This method builds the meadow out of shape nodes, one per flower, tree and edge of the forest. 
+        #It is mostly useful for debugging, as the nodes can be inspected and moved around. 
+        def build_meadow(self):
+                for position in self.flower_positions:
+                        flower = Flower2(parent=self)
+                        flower.position = position
+                        self.flower_list.append(flower)
+                        if self.lod is not None:
+                                self.lod.add(flower)
+
+                for x, y, w, h in self.forest_rects:
+                        forest = ShapeNode(rect(w, h), '#006900')
+                        self.add_child(forest)
+                        forest.position = (x, y)
+                        forest.z_position = 2
+                        self.forest_list.append(forest)
+
+                for position in self.tree_positions:
+                        tree = Tree(parent=self)
+                        tree.position = position
+                        tree.z_position = 2
+                        self.tree_list.append(tree)
+
+        #This method draws the meadow into a few large images instead, see meadow.py. The flowers go in 
+        #a layer below the animals, and the trees and the edge of the forest in a layer above them. 
+        def bake_meadow(self):
+                ground = StaticLayer(self, 0.5, self.TILE_SIZE, self.TILE_SCALE)
+                for x, y in self.flower_positions:
+                        ground.add(x, y, 10, 10, Flower2.draw)
+
+                forest = StaticLayer(self, 2, self.TILE_SIZE, self.TILE_SCALE)
+                for x, y, w, h in self.forest_rects:
+                        forest.add(x, y, w, h, lambda x, y, w=w, h=h: fill_rect(x, y, w, h, '#006900'))
+                for x, y in self.tree_positions:
+                        forest.add(x, y, 150, 150, Tree.draw)
+
+                ground.bake()
+                forest.bake()
+                self.meadow_layers = [ground, forest]
+
+        #This method hands the nodes of the meadow over to a viewport culler (see spatial.py), which keeps 
+        #only those near the screen attached to the scene as the screen moves. 
+        def cull_meadow(self):
+                self.culler = ViewportCuller(self, self.CULL_CELL_SIZE, self.CULL_MARGIN)
+                for layer in self.meadow_layers:
+                        for sprite in layer.tiles.values():
+                                self.culler.add(sprite, sprite.position.x, sprite.position.y, sprite.size.w, sprite.size.h)
+                for flower in self.flower_list:
+                        self.culler.add(flower, flower.position.x, flower.position.y, 10, 10)
+                for tree in self.tree_list:
+                        self.culler.add(tree, tree.position.x, tree.position.y, 150, 150)
+                for forest, (x, y, w, h) in zip(self.forest_list, self.forest_rects):
+                        self.culler.add(forest, x, y, w, h)
+                self.update_viewport()
+
+        #This method sets up the endless meadow instead, see chunks.py. There is no forest around it, 
+        #just the odd tree, and the chunks of the meadow are generated as the screen moves. 
+        def chunk_meadow(self):
+                if self.MEADOW_SEED is None:
+                        self.MEADOW_SEED = random.randrange(2 ** 31)
+                decorations = [
+                        Decoration(self.FLOWERS_PER_CHUNK, 10, 10, 0.5, Flower2.draw, Flower2),
+                        Decoration(self.TREES_PER_CHUNK, 150, 150, 2, Tree.draw, Tree, baked=False)]
+                self.chunks = ChunkedMeadow(self, decorations, self.MEADOW_SEED, self.CHUNK_SIZE, self.CULL_MARGIN, self.MAX_CHUNKS, self.BAKE_STATIC, self.lod, self.TILE_SCALE)
+                self.update_viewport()
+
+        #The part of the meadow that is on the screen is the scene's own rectangle, moved by the 
+        #scrolling done in move_screen. 
+        def update_viewport(self):
+                X = self.position.x
+                Y = self.position.y
+                if self.culler is not None:
+                        self.culler.update(-X, -Y, -X + self.size.w, -Y + self.size.h)
+                if self.chunks is not None:
+                        self.chunks.update(-X, -Y, -X + self.size.w, -Y + self.size.h)
 
 
-        #This method is the update loop of the Game class and updates the game at about 60 FPS.
+        #This method is the update loop of the Game class, called every time the screen is redrawn. The 
+        #game is moved on by as many steps as fit in the time since the last frame, so that it runs at the 
+        #same speed on every device. Time left over for the next frame is used to draw the animals part of 
+        #the way from their positions after the last step but one to those after the last step. 
         def update(self):
                 self.set_position()
-                self.move_animal(self.wolf)
-                self.wolf.move(u = self.wolf.relative_speed_x, v = self.wolf.relative_speed_y)
+                if self.FIXED_STEP:
+                        self.restore_positions()
+                        self.accumulator = min(self.accumulator + self.dt * self.STEP_RATE, self.MAX_STEPS)
+                        steps = int(self.accumulator + 1e-6)
+                        self.accumulator = max(0.0, self.accumulator - steps)
+                        for k in range(steps):
+                                if k == steps - 1 and self.INTERPOLATE:
+                                        self.previous_positions = self.node_positions()
+                                        self.previous_herd = self.herd.positions()
+                                self.step()
+                        if self.INTERPOLATE and self.previous_positions is not None:
+                                self.current_positions = self.node_positions()
+                                self.interpolate_positions(self.accumulator)
+                else:
+                        self.step()
+                self.update_tweens()
+                if self.lod is not None:
+                        self.detail_frames -= 1
+                        if self.detail_frames <= 0:
+                                self.detail_frames = self.LOD_INTERVAL
+                                self.update_detail()
+                if self.snapshots is not None and self.t - self.last_snapshot >= self.SNAPSHOT_INTERVAL:
+                        self.take_snapshot()
+
+        #This method moves all running tweens on to the time of this frame. 
+        def update_tweens(self):
+                self.tweens.update(self.t)
+
+        #This method chooses how much detail the animals and flowers are drawn with, by how far they are from 
+        #the middle of the screen and how many nodes they take together, see lod.py. 
+        def update_detail(self):
+                X, Y = self.camera_position()
+                self.lod.update(-X + self.size.w / 2, -Y + self.size.h / 2, self.LOD_SCALE)
+
+        #The level of detail by distance from the middle of the screen for something at (x, y). 
+        def detail_at(self, x, y):
+                if self.lod is None:
+                        return 0
+                X, Y = self.camera_position()
+                return self.lod.level_at(x, y, -X + self.size.w / 2, -Y + self.size.h / 2, self.LOD_SCALE)
+
+        def node_positions(self):
+                return [(node.position.x, node.position.y) for node in self.smoothed_nodes]
+
+        #Moves the animals and the camera a fraction alpha of the way from their positions after the last 
+        #step but one to those after the last step. Of the sheep, only those in the scene are moved. 
+        def interpolate_positions(self, alpha):
+                for node, (x_0, y_0), (x_1, y_1) in zip(self.smoothed_nodes, self.previous_positions, self.current_positions):
+                        node.position = (x_0 + (x_1 - x_0) * alpha, y_0 + (y_1 - y_0) * alpha)
+                if self.herd:
+                        self.herd.interpolate(self.previous_herd, alpha)
+
+        #Puts the dog, the wolf and the camera back where the last step left them. 
+        def restore_positions(self):
+                if self.current_positions is not None:
+                        for node, position in zip(self.smoothed_nodes, self.current_positions):
+                                node.position = position
+                        self.current_positions = None
+
+        #The position of the camera after the last step, rather than where it is drawn. 
+        def camera_position(self):
+                if self.current_positions is not None:
+                        return self.current_positions[0]
+                return (self.position.x, self.position.y)
+
+        #Forgets the positions used for drawing in between steps, e.g. after the animals have been put in 
+        #place by a replay. 
+        def reset_interpolation(self):
+                self.previous_positions = None
+                self.current_positions = None
+                self.previous_herd = None
+
+        #Moves the game on by one step. 
+        def step(self):
+                self.sample_input()
+                if self.VECTORIZED_ANIMALS:
+                        for animal in self.animals:
+                                k = animal.kinematics
+                                self.herd.drive(animal.herd_index, (k.vx, k.vy), k.u, k.v)
+                else:
+                        self.move_animals()
+                        self.animate_animals()
+                self.move_herd()
                 self.leave_tracks(animal = self.wolf)
-                self.move_animal(self.dog)
-                self.move_screen(self.dog 
-                )
-                self.dog.move(u = self.get_velocity()[0], v = self.get_velocity()[1])
-                self.dog.wag_tail(t = self.time)
+                self.move_screen(self.dog)
                 self.leave_tracks(animal = self.dog)
-                self.dog.turn_head(velocity = self.get_speed())
+                self.dog.turn_head(velocity = self.input_speed)
                 self.wolf_collision()
                 #self.sniff()
+                self.sync_nodes()
                 self.time += 1
         
-        #This method calculates the velocity based on the position of the iPhone, as the 
-        #dog is moved using the iPhone's built-in gyroscope and accelerometer. 
+        #This method reads the position of the iPhone once per frame, as the dog is moved using the 
+        #iPhone's built-in gyroscope and accelerometer, and works out the velocity of every animal 
+        #from it. All other methods use these values for the rest of the frame, so the sensor is only 
+        #read once, and the wolf, whose velocity method moves it along its path, takes exactly one 
+        #step per frame. 
+        def sample_input(self):
+                gx, gy = self.read_gravity()
+                u = (gx - self.gx) / self.factor_x
+                v = (gy - self.gy) / self.factor_y
+                self.input_velocity = [u, v]
+                self.input_speed = math.sqrt(u * u + v * v)
+                for animal in self.animals:
+                        animal.velocity(u = u, v = v)
+                if self.ADAPTIVE_CALIBRATION:
+                        self.adapt_calibration(gx, gy, u, v)
+
+        #This method reads the position of the iPhone, as smoothed by the sensor sampler (see sensors.py), 
+        #or from a recording when the game is being replayed. When the game is being recorded, the reading 
+        #is saved. Without the sampler thread, the sensor is read here, at the time of the step. 
+        def read_gravity(self):
+                if self.replay is not None:
+                        return self.replay.sample(self.time)
+                gx, gy, gz = self.sensor.read(self.time / float(self.STEP_RATE))
+                if self.recorder is not None:
+                        self.recorder.record(self, gx, gy)
+                return gx, gy
+
+        #This method returns the velocity based on the position of the iPhone in this frame. 
         def get_velocity(self): 
-                g = gravity()   
-                u = (g.x - self.gx) / self.factor_x
-                v = (g.y - self.gy) / self.factor_y
-                vel = [u, v]
-                return vel
+                return self.input_velocity
         
         #Same as above, but returns the speed instead. 
         def get_speed(self): 
-                g = gravity()           
-                u = (g.x - self.gx) / self.factor_x
-                v = (g.y - self.gy) / self.factor_y
-                speed = math.sqrt(u * u + v * v)
-                return speed
+                return self.input_speed
         
         #Method to allow the dog to sniff after the wolf. Not currently in use. Will be incorporated 
         #in the Dog class in a future version. 
@@ -459,11 +790,11 @@ class Game (Scene):
         #These are aligned with the direction of movement, become spread out as the animal moves faster, 
         #and gradually fade. The current positioning of the paw prints is adapted for the dog and wolf.
         #This will be made more general in future versions. 
-       def leave_tracks(self, animal):
-                vel = animal.velocity(u = self.get_velocity()[0], v = self.get_velocity()[1])
-                speed = animal.speed(velocity = vel)
-                mod = int(animal.gait + speed)
-                rot = animal.rotation
+        def leave_tracks(self, animal):
+                k = animal.kinematics
+                speed = math.sqrt(k.vx * k.vx + k.vy * k.vy)
+                mod = int(animal.tracks.gait + speed)
+                rot = animal.transform.rotation
 
                 t_1 = 0 
                 t_2 = int(0.1 * mod)
@@ -472,71 +803,153 @@ class Game (Scene):
 
                 times = [t_1, t_2, t_3, t_4]
 
-                t = self.time % mod
+                #A paw is put down in the step in which the game time, in sixtieths of a second, reaches its time. 
+                L = self.step_length
+                t = self.time * L % mod
                 for i in range(4):
-                        if t == times[i]:
-                                        paw = animal.paw_print() 
-                                        self.add_child(paw)
+                        if (t - times[i]) % mod < L:
+                                        r = 0.7 * animal.tracks.radius
+                                        x = animal.transform.x + r * math.cos(rot + (-3 + 4 * i) * math.pi / 4)
+                                        y = animal.transform.y + r * math.sin(rot + (-3 + 4 * i) * math.pi / 4)
+                                        #Paw prints further from the screen than it can move before they fade are never seen. 
+                                        if self.culler is not None and not self.culler.contains(x, y, self.paw_print_reach):
+                                                continue
+                                        paw = self.paw_pool.acquire(animal, self.t, self.detail_at(x, y)) 
                                         paw.rotation = rot
-                                        paw.position = animal.position + (0.7 * animal.radius * math.cos(rot + (-3 + 4 * i) * math.pi / 4), 0.7 * animal.radius * math.sin(rot + (-3 + 4 * i) * math.pi / 4))
-                                        actions = [Action.fade_to(0, 1.5), Action.remove()]
-                                        paw.run_action(Action.sequence(actions))                                        
+                                        paw.position = (x, y)
         
+        #This method moves and animates all the animals in the animal store at once. Sheep which are far 
+        #from the screen are taken out of the scene until they come closer. 
+        def move_herd(self):
+                if not self.herd:
+                        return
+                viewport = None
+                if self.culler is not None or self.chunks is not None:
+                        X = self.position.x
+                        Y = self.position.y
+                        m = self.CULL_MARGIN
+                        viewport = (-X - m, -Y - m, -X + self.size.w + m, -Y + self.size.h + m)
+                self.herd.step(self.time * self.step_length, None if self.INFINITE_MEADOW else self.FIELD_SIZE, viewport, self.step_length)
+                if self.VECTORIZED_ANIMALS:
+                        for animal in self.animals:
+                                animal.entity.pull()
+
         #This method moves the animals across the screen by using the given animals velocity method. 
         #This means that the wolf is moving according to its automatic path, and the dog moves 
         #based on the positioning of the iPhone. 
-        def move_animal(self, animal):
-                x = animal.position.x
-                y = animal.position.y
-                S = self.FIELD_SIZE
+        def move_animals(self):
+                self.entities.integrate(None if self.INFINITE_MEADOW else self.FIELD_SIZE, self.step_length)
 
-                x += animal.velocity(u = self.get_velocity()[0], v = self.get_velocity()[1])[0] 
-                y += animal.velocity(u = self.get_velocity()[0], v = self.get_velocity()[1])[1] 
+        #This method animates the animals as they move (see Animal.move), and makes the dog wag its tail. 
+        def animate_animals(self):
+                self.entities.animate(GAIT_TABLE, self.time * self.step_length, self.step_length)
 
-                x = max(-S, min(S, x))
-                y = max(-S, min(S, y))
-                animal.position = (x, y)
+        #This method writes what has changed about the animals in this step to their nodes. 
+        def sync_nodes(self):
+                self.entities.sync()
         
         #This method centers the screen on the animal fed into it. In the current implementation of the game, 
         #this is the dog, but it can flexibly be changed to any of the animals for a different player experience. 
         def move_screen(self, animal):  
-                x = animal.position.x
-                y = animal.position.y
+                x = animal.transform.x
+                y = animal.transform.y
                 X = self.position.x
                 Y = self.position.y
+                k = animal.kinematics
 
                 if x <= - X + self.size.w / 3 or x >= - X + 2 * (self.size.w) / 3:
-                        X -= animal.velocity(u = self.get_velocity()[0], v = self.get_velocity()[1])[0] 
+                        X -= k.vx * self.step_length 
 
                 if y <= - Y + self.size.h / 3 or y >= - Y + 2 * (self.size.h) / 3:
-                        Y -= animal.velocity(u = self.get_velocity()[0], v = self.get_velocity()[1])[1] 
+                        Y -= k.vy * self.step_length 
 
                 self.position = (X, Y)
+                self.update_viewport()
         
         #This method makes sure that the moving of the dog works well regardless of how the iPhone is positioned 
         #as the game is started. It makes sure that the neutral position (where the dog is not moving), is that 
-        #of the phone as the game is started. 
+        #of the phone as the game is started, after which it is adapted as the game is played (see adapt_calibration). 
         def set_position(self):
-                if self.t == 0:
-                        g = gravity()
-                        self.gx = g.x
-                        self.gy = g.y
-                        self.factor_x = min(1 - self.gx, 1 + self.gx)
-                        self.factor_y = min(1 - self.gy, 1 + self.gy)
+                if not self.calibrated:
+                        self.calibrated = True
+                        gx, gy, gz = self.sensor.read(self.time / float(self.STEP_RATE))
+                        self.calibrate(gx, gy)
+
+        #Takes (gx, gy) as the neutral position of the phone, and scales the input so that the phone can be 
+        #tilted as far to either side before the dog runs at full speed. 
+        def calibrate(self, gx, gy):
+                self.gx = gx
+                self.gy = gy
+                self.factor_x = min(1 - gx, 1 + gx)
+                self.factor_y = min(1 - gy, 1 + gy)
+
+        #While the phone is held within the dead zone of the animals' velocity (see Animal.velocity), where 
+        #the dog stands still, the neutral position slowly follows it, so that a player who settles into 
+        #another grip, or a sensor which drifts, does not end up with a dog which creeps off. 
+        def adapt_calibration(self, gx, gy, u, v):
+                if abs(u) <= 0.05 and abs(v) <= 0.05:
+                        r = self.calibration_rate
+                        self.calibrate(self.gx + r * (gx - self.gx), self.gy + r * (gy - self.gy))
         
-        #This method checks for collisions between the dog and the wolf, and takes a point of the 
-        #wolf's health counter each time this happens. 
+        #This method checks for collisions between the animals (see collision.py). Each time the dog 
+        #catches up with the wolf, a point is taken off the wolf's health counter, and each time the wolf 
+        #catches up with a sheep, a point is taken off the sheep's. The dog is body 0, the wolf body 1, 
+        #and sheep number i body 2 + i. 
         def wolf_collision(self):
-                v1 = Vector2(self.dog.position.x, self.dog.position.y)
-                v2= Vector2(self.wolf.position.x, self.wolf.position.y)
-
-                if abs(v1 - v2) < 0.5 * (self.dog.size.x + self.dog.size.y):
-                        self.wolf.health -= 1
-                        self.wolf.health_label.text = str(self.wolf.health)
-                        sound.play_effect('8ve:8ve-tap-toothy')
-
-
-
+                xs, ys, radii = self.contact_bodies()
+                entered, stayed, exited = self.contacts.update(range(len(xs)), xs, ys, radii)
+                self.handle_contacts(entered)
+
+        def contact_bodies(self):
+                xs = [self.dog.transform.x, self.wolf.transform.x]
+                ys = [self.dog.transform.y, self.wolf.transform.y]
+                radii = [self.dog.radius, self.wolf.radius]
+                n = len(self.sheep_list)
+                if n:
+                        xs.extend(self.herd.x[:n].tolist())
+                        ys.extend(self.herd.y[:n].tolist())
+                        radii.extend(self.herd.radius[:n].tolist())
+                return xs, ys, radii
+
+        #Works out which animals touch without acting on it, e.g. after the animals have been put in place. 
+        def prime_contacts(self):
+                self.contacts.clear()
+                xs, ys, radii = self.contact_bodies()
+                self.contacts.update(range(len(xs)), xs, ys, radii)
+
+        def handle_contacts(self, entered):
+                for a, b in entered:
+                        if (a, b) == (0, 1):
+                                self.wolf.health -= 1
+                                sound.play_effect('8ve:8ve-tap-toothy')
+                        elif a == 1 and b >= 2:
+                                self.herd.health[b - 2] -= 1
+
+        #Returns a snapshot of the state of the game, see snapshot.py. 
+        def snapshot(self):
+                return snapshot.take(self)
+
+        #Puts the game back in the state of a snapshot of it. 
+        def restore_snapshot(self, data):
+                snapshot.restore(self, data)
+
+        #Keeps a snapshot of the game for rewinding it, and writes it to SNAPSHOT_PATH if that is set. 
+        def take_snapshot(self):
+                self.snapshots.take(self)
+                self.last_snapshot = self.t
+                if self.SNAPSHOT_PATH is not None:
+                        self.snapshots.save(self.SNAPSHOT_PATH)
+
+        #Puts the game back to the last snapshot, or one taken back snapshots before it. 
+        def rewind(self, back = 0):
+                self.snapshots.rewind(self, back)
+
+        #Called when the game is closed. 
+        def stop(self):
+                self.sensor.stop()
+                if self.recorder is not None:
+                        self.recorder.close()
+                SHAPES.clear()
 
 if __name__ == '__main__':
         run(Game(), PORTRAIT, frame_interval = 1, show_fps=True)
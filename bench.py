@@ -0,0 +1,278 @@
+"""
+Benchmarks of the game loop, run headless with fixed seeds and scripted input, with baselines to compare against.
+
+Each scenario times many frames (or setups, or calls) of the game on the headless backend (see simulate.py)
+and reports the median and the tail of their times, in microseconds, and the peak memory allocated by Python
+while it runs, in kilobytes. The results are written to a JSON file, which can be kept as a baseline, and a
+later run compared against it: a scenario whose median, tail or peak memory has grown by more than the
+threshold is flagged as a regression, and the comparison exits with status 1.
+
+        python bench.py run --out baseline.json
+        ... change the game ...
+        python bench.py run --out current.json
+        python bench.py compare baseline.json current.json --threshold 10
+
+The scenarios are:
+
+        herd_1 ... herd_1000    steady-state frames with 1, 10, 100 and 1000 sheep on the meadow
+        setup_600 ... setup_2400 setup() of a field of that size, with flowers and trees in proportion
+        paw_churn               frames of animals leaving paw prints as fast as they can into a small pool
+        collisions              frames of a herd crowded into a small field, touching all the time
+        move_dog, move_wolf     a single call of Dog.move or Wolf.move, with its nodes brought up to date
+
+Timings depend on the computer, so baselines are only comparable with runs on the same one.
+"""
+
+import argparse
+from collections import OrderedDict
+import gc
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy
+
+import headless
+
+headless.install()
+
+import ADogsLife
+import simulate
+
+SEED = 1
+WARMUP_FRAMES = 60 #Frames played before the timed ones, so that the pools and caches are filled.
+
+FORMAT_VERSION = 1
+
+#The statistics compared against a baseline, and whether the tail threshold applies to them.
+COMPARED = [('median_us', False), ('p95_us', True), ('p99_us', True), ('peak_kb', False)]
+
+
+#Plays a game headless, and returns the times of its frames after the warm-up, in seconds.
+def frames(game, count, tilt=simulate.circle):
+        result = simulate.simulate(WARMUP_FRAMES + count, seed=SEED, tilt=tilt, game=game, frame_times=True)
+        return result.frame_times[WARMUP_FRAMES:]
+
+
+def herd(size):
+        def run(quick):
+                game = ADogsLife.Game()
+                game.HERD_SIZE = size
+                return frames(game, 120 if quick else 600)
+        return run
+
+#The meadow grows with the field: the number of flowers with its area, and the number of trees with its edge.
+def setup(field_size):
+        def run(quick):
+                k = field_size / 600.0
+                times = []
+                for i in range(3 if quick else 8):
+                        game = ADogsLife.Game()
+                        game.FIELD_SIZE = field_size
+                        game.FLOWER_COUNT = int(200 * k * k)
+                        game.TREE_COUNT = int(200 * k)
+                        times.append(simulate.simulate(0, seed=SEED, game=game).setup_time)
+                return numpy.array(times[1:]) #The first also pays for importing and warming up.
+        return run
+
+#The animals leave a paw print every other step into a pool of forty, so prints are reused before they fade.
+class ChurnGame (ADogsLife.Game):
+        MAX_PAW_PRINTS = 40
+
+        def setup(self):
+                ADogsLife.Game.setup(self)
+                for animal in self.animals:
+                        animal.tracks.gait = 2
+
+def paw_churn(quick):
+        return frames(ChurnGame(), 120 if quick else 600, lambda frame: simulate.wander(frame, 1.0, 30))
+
+def collisions(quick):
+        game = ADogsLife.Game()
+        game.FIELD_SIZE = 150
+        game.FLOWER_COUNT = 20
+        game.TREE_COUNT = 20
+        game.HERD_SIZE = 300
+        return frames(game, 120 if quick else 600)
+
+#Times calls of the animal's move method, in batches, over a circle of inputs at full and partial speed. Since
+#move only works on the animal's components, each call is followed by writing them to its nodes, as the game
+#does once per step (see Entity.sync), so that the whole cost of animating the animal is timed.
+def move(kind):
+        def run(quick):
+                animal = kind()
+                entity = animal.entity
+                inputs = [(r * math.cos(a), r * math.sin(a)) for r in (0.3, 0.7, 1.0) for a in numpy.linspace(0, 2 * math.pi, 20)]
+                batch = 1000
+                clock = time.perf_counter
+                times = []
+                for n in range(20 if quick else 200):
+                        t = clock()
+                        for k in range(batch):
+                                u, v = inputs[k % len(inputs)]
+                                animal.move(u, v)
+                                entity.sync()
+                        times.append((clock() - t) / batch)
+                return numpy.array(times)
+        return run
+
+SCENARIOS = OrderedDict()
+for size in (1, 10, 100, 1000):
+        SCENARIOS['herd_%d' % size] = herd(size)
+for field_size in (600, 1200, 2400):
+        SCENARIOS['setup_%d' % field_size] = setup(field_size)
+SCENARIOS['paw_churn'] = paw_churn
+SCENARIOS['collisions'] = collisions
+SCENARIOS['move_dog'] = move(ADogsLife.Dog)
+SCENARIOS['move_wolf'] = move(ADogsLife.Wolf)
+
+
+def summarize(times):
+        us = numpy.asarray(times) * 1e6
+        return OrderedDict([
+                ('samples', len(us)),
+                ('median_us', float(numpy.median(us))),
+                ('mean_us', float(us.mean())),
+                ('p95_us', float(numpy.percentile(us, 95))),
+                ('p99_us', float(numpy.percentile(us, 99))),
+                ('max_us', float(us.max())),
+        ])
+
+#Runs a scenario repeat times for its times, keeping the run with the lowest median, as the others were
+#slowed down by something else on the computer. It is then run once more, in its quick form, under tracemalloc
+#for its peak memory, which would slow the timed runs down.
+def measure(run, quick, repeat=1):
+        result = None
+        for k in range(repeat):
+                gc.collect()
+                times = summarize(run(quick))
+                if result is None or times['median_us'] < result['median_us']:
+                        result = times
+        gc.collect()
+        tracemalloc.start()
+        try:
+                run(True)
+                current, peak = tracemalloc.get_traced_memory()
+        finally:
+                tracemalloc.stop()
+        result['peak_kb'] = peak / 1024.0
+        return result
+
+def environment():
+        return OrderedDict([
+                ('python', platform.python_version()),
+                ('implementation', platform.python_implementation()),
+                ('numpy', numpy.__version__),
+                ('platform', platform.platform()),
+                ('machine', platform.machine()),
+        ])
+
+def run_benchmarks(names=None, quick=False, repeat=1, log=None):
+        names = list(SCENARIOS) if not names else names
+        results = OrderedDict()
+        for name in names:
+                if name not in SCENARIOS:
+                        raise ValueError('unknown scenario %s' % name)
+                start = time.perf_counter()
+                results[name] = measure(SCENARIOS[name], quick, repeat)
+                if log is not None:
+                        r = results[name]
+                        log('%-12s median %10.1f us  p99 %10.1f us  peak %9.1f kB  (%.1f s)' % (name, r['median_us'], r['p99_us'], r['peak_kb'], time.perf_counter() - start))
+        return OrderedDict([('version', FORMAT_VERSION), ('quick', quick), ('repeat', repeat), ('seed', SEED), ('environment', environment()), ('scenarios', results)])
+
+
+#Compares the results of a run against a baseline. Returns a list of rows (scenario, statistic, baseline,
+#current, change in percent, verdict), where the verdict is 'regression' if the statistic grew by more than
+#the threshold (tail_threshold for the tail times), 'improvement' if it shrank by more, and '' otherwise.
+def compare(baseline, current, threshold=10.0, tail_threshold=25.0):
+        rows = []
+        for name, result in current['scenarios'].items():
+                base = baseline['scenarios'].get(name)
+                if base is None:
+                        continue
+                for statistic, tail in COMPARED:
+                        if statistic not in base or statistic not in result:
+                                continue
+                        limit = tail_threshold if tail else threshold
+                        b = base[statistic]
+                        c = result[statistic]
+                        change = 100.0 * (c - b) / b if b else 0.0
+                        verdict = 'regression' if change > limit else 'improvement' if change < -limit else ''
+                        rows.append((name, statistic, b, c, change, verdict))
+        return rows
+
+def show_comparison(rows):
+        print('%-12s %-10s %12s %12s %9s' % ('scenario', 'statistic', 'baseline', 'current', 'change'))
+        for name, statistic, b, c, change, verdict in rows:
+                print('%-12s %-10s %12.1f %12.1f %8.1f%% %s' % (name, statistic, b, c, change, verdict))
+
+def load(path):
+        with open(path) as f:
+                results = json.load(f)
+        if results.get('version') != FORMAT_VERSION:
+                raise ValueError('%s is not a version %d benchmark file' % (path, FORMAT_VERSION))
+        return results
+
+def save(path, results):
+        with open(path, 'w') as f:
+                json.dump(results, f, indent=2)
+                f.write('\n')
+
+
+def main(argv=None):
+        parser = argparse.ArgumentParser(description='Benchmark the game loop headless, and compare against a baseline.')
+        commands = parser.add_subparsers(dest='command')
+        run = commands.add_parser('run', help='run the benchmarks')
+        run.add_argument('--only', default='', help='a comma-separated list of scenarios, all by default')
+        run.add_argument('--quick', action='store_true', help='fewer frames, for a quick check')
+        run.add_argument('--repeat', type=int, default=3, help='timed runs of every scenario, of which the fastest is kept')
+        run.add_argument('--out', default='bench.json', help='the results file')
+        run.add_argument('--baseline', metavar='PATH', help='compare the results against this baseline')
+        run.add_argument('--threshold', type=float, default=10.0, help='percent growth of the median or peak memory flagged as a regression')
+        run.add_argument('--tail-threshold', type=float, default=25.0, help='the same for the 95th and 99th percentiles')
+        against = commands.add_parser('compare', help='compare a results file against a baseline')
+        against.add_argument('baseline')
+        against.add_argument('current')
+        against.add_argument('--threshold', type=float, default=10.0)
+        against.add_argument('--tail-threshold', type=float, default=25.0)
+        commands.add_parser('list', help='list the scenarios')
+        args = parser.parse_args(argv)
+
+        if args.command == 'list':
+                for name in SCENARIOS:
+                        print(name)
+                return 0
+        if args.command == 'run':
+                names = [name for name in args.only.split(',') if name]
+                for name in names:
+                        if name not in SCENARIOS:
+                                parser.error('unknown scenario %s' % name)
+                current = run_benchmarks(names, args.quick, args.repeat, print)
+                save(args.out, current)
+                print('written to %s' % args.out)
+                if not args.baseline:
+                        return 0
+                baseline = load(args.baseline)
+        elif args.command == 'compare':
+                baseline = load(args.baseline)
+                current = load(args.current)
+        else:
+                parser.print_help()
+                return 2
+
+        if baseline.get('quick') != current.get('quick'):
+                print('warning: comparing a quick run with a full one')
+        if baseline.get('environment') != current.get('environment'):
+                print('warning: the baseline was run in another environment')
+        rows = compare(baseline, current, args.threshold, args.tail_threshold)
+        show_comparison(rows)
+        regressions = [row for row in rows if row[5] == 'regression']
+        print('%d regressions' % len(regressions))
+        return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+        sys.exit(main())
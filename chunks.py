@@ -0,0 +1,180 @@
+"""
+An endless meadow, made up of square chunks which are generated as the camera gets near them.
+
+The content of every chunk is worked out from the seed of the meadow and the position of the chunk alone,
+so a chunk looks the same every time it is generated. Only the chunks near the screen are in the scene, with
+nodes and images, and these are let go as soon as the chunk leaves the screen; of the others, only the
+layouts of the most recently seen are kept, so the cost of the meadow does not depend on how far the dog runs.
+"""
+
+from collections import OrderedDict
+import random
+
+from scene import *
+
+from shapes import screen_scale
+
+
+#A kind of decoration scattered over the chunks: how many of them there are per chunk, how big they are, at
+#which depth they are drawn, and how to draw them into an image (centred on a point, with the y axis pointing
+#down) or build them as a node. A decoration that is not baked is always built as a node, e.g. one so rare
+#that an image of the whole chunk for it would be mostly empty.
+class Decoration (object):
+        def __init__(self, count, w, h, z_position, draw, make_node=None, baked=True):
+                self.count = count
+                self.w = w
+                self.h = h
+                self.z_position = z_position
+                self.draw = draw
+                self.make_node = make_node
+                self.baked = baked
+
+
+#A generated chunk: the layout of its decorations, and the nodes that make it up while it is attached.
+class Chunk (object):
+        def __init__(self, key, items):
+                self.key = key
+                self.items = items
+                self.nodes = []
+                self.attached = False
+
+
+class ChunkedMeadow (object):
+        #scale is the pixels per point of the baked images, that of the screen by default. max_chunks is the number of chunks whose layouts are
+        #kept, which costs little, as only the attached chunks have nodes and images.
+        def __init__(self, parent, decorations, seed=0, chunk_size=512, margin=100, max_chunks=16, bake=True, lod=None, scale=None):
+                self.parent = parent
+                self.decorations = decorations
+                self.seed = seed
+                self.chunk_size = chunk_size
+                self.margin = margin
+                self.max_chunks = max_chunks
+                self.bake = bake
+                self.lod = lod #The levels of detail the nodes of the chunks are drawn at, if they are not baked (see lod.py).
+                self.scale = scale if scale is not None else screen_scale()
+                self.chunks = OrderedDict() #Least recently seen first.
+                self.visible = set()
+                self.generated = 0
+                self.evicted = 0
+
+        #Returns the random number generator for the chunk in column i and row j.
+        def chunk_random(self, i, j):
+                return random.Random('%d:%d:%d' % (self.seed, i, j))
+
+        #Works out the decorations of a chunk, as (decoration, x, y) in the coordinates of the parent.
+        def layout(self, i, j):
+                rng = self.chunk_random(i, j)
+                S = self.chunk_size
+                items = []
+                for decoration in self.decorations:
+                        for n in range(decoration.count):
+                                items.append((decoration, (i + rng.random()) * S, (j + rng.random()) * S))
+                return items
+
+        def generate(self, i, j):
+                self.generated += 1
+                return Chunk((i, j), self.layout(i, j))
+
+        #Builds the nodes of a chunk from its layout: the images of the decorations that are baked, and a node
+        #for every other decoration.
+        def build(self, chunk):
+                i, j = chunk.key
+                baked = [item for item in chunk.items if self.bake and item[0].baked]
+                nodes = self.bake_chunk(i, j, baked) if baked else []
+                for decoration, x, y in chunk.items:
+                        if self.bake and decoration.baked:
+                                continue
+                        node = decoration.make_node()
+                        node.position = (x, y)
+                        node.z_position = decoration.z_position
+                        nodes.append(node)
+                        if self.lod is not None and hasattr(node, 'set_detail'):
+                                self.lod.add(node)
+                return nodes
+
+        #Draws the decorations of a chunk into one image per depth. The images reach beyond the chunk by half
+        #the size of the largest decoration, so that decorations on the edge of the chunk are not cut off.
+        def bake_chunk(self, i, j, items):
+                S = self.chunk_size
+                layers = OrderedDict()
+                for item in items:
+                        layers.setdefault(item[0].z_position, []).append(item)
+
+                nodes = []
+                for z, layer in layers.items():
+                        pad = max(max(d.w, d.h) for d, x, y in layer) / 2
+                        with ui.ImageContext(S + 2 * pad, S + 2 * pad, scale=self.scale) as ctx:
+                                for decoration, x, y in layer:
+                                        decoration.draw(x - i * S + pad, (j + 1) * S + pad - y)
+                                image = ctx.get_image()
+                        sprite = SpriteNode(Texture(image))
+                        sprite.position = ((i + 0.5) * S, (j + 0.5) * S)
+                        sprite.z_position = z
+                        nodes.append(sprite)
+                return nodes
+
+        #Makes sure that the chunks overlapping the viewport, given as the rectangle from (x0, y0) to (x1, y1)
+        #plus the margin, are generated and attached, and that all others are detached. The layouts of the least
+        #recently seen chunks are then forgotten until at most max_chunks remain.
+        def update(self, x0, y0, x1, y1):
+                S = float(self.chunk_size)
+                m = self.margin
+                i0, i1 = int((x0 - m) // S), int((x1 + m) // S)
+                j0, j1 = int((y0 - m) // S), int((y1 + m) // S)
+                visible = set((i, j) for i in range(i0, i1 + 1) for j in range(j0, j1 + 1))
+                if visible == self.visible:
+                        return
+
+                for key in self.visible - visible:
+                        chunk = self.chunks.get(key)
+                        if chunk is not None:
+                                self.detach(chunk)
+
+                for key in visible:
+                        chunk = self.chunks.get(key)
+                        if chunk is None:
+                                chunk = self.chunks[key] = self.generate(*key)
+                        else:
+                                self.chunks.move_to_end(key)
+                        if not chunk.attached:
+                                self.attach(chunk)
+
+                self.visible = visible
+                while len(self.chunks) > max(self.max_chunks, len(visible)):
+                        key, chunk = next(iter(self.chunks.items()))
+                        if key in visible:
+                                self.chunks.move_to_end(key)
+                                continue
+                        del self.chunks[key]
+                        self.evicted += 1
+
+        def attach(self, chunk):
+                chunk.nodes = self.build(chunk)
+                for node in chunk.nodes:
+                        self.parent.add_child(node)
+                chunk.attached = True
+
+        #Takes the nodes of a chunk out of the scene and lets go of them, and of their images with them.
+        def detach(self, chunk):
+                for node in chunk.nodes:
+                        node.remove_from_parent()
+                        if self.lod is not None:
+                                self.lod.remove(node)
+                chunk.nodes = []
+                chunk.attached = False
+
+        def clear(self):
+                for chunk in self.chunks.values():
+                        if chunk.attached:
+                                self.detach(chunk)
+                self.chunks.clear()
+                self.visible = set()
+
+        def stats(self):
+                return {
+                        'loaded': len(self.chunks),
+                        'visible': len(self.visible),
+                        'nodes': sum(len(chunk.nodes) for chunk in self.chunks.values()),
+                        'generated': self.generated,
+                        'evicted': self.evicted,
+                }
@@ -0,0 +1,138 @@
+"""
+Collision detection between the animals.
+
+The broad phase puts every animal in a spatial hash of square cells, so that only animals in the same or in
+neighbouring cells are compared, and the narrow phase compares their distance with the sum of their radii.
+Contacts are tracked from one frame to the next, so each contact is reported once as it begins (enter), then
+every frame it lasts (stay), and once as it ends (exit).
+
+Run this module to benchmark the broad phase against comparing every pair of animals:
+
+        python collision.py
+"""
+
+import math
+import random
+import time
+
+
+#Offsets to the neighbouring cells that each cell is compared with. Together with the cell itself, these
+#cover every pair of neighbouring cells exactly once.
+NEIGHBOURS = ((1, -1), (1, 0), (1, 1), (0, 1))
+
+
+#A spatial hash of square cells, rebuilt every frame from the positions of the bodies.
+class SpatialHash (object):
+        def __init__(self, cell_size=32):
+                self.cell_size = cell_size
+                self.cells = {}
+
+        def build(self, xs, ys):
+                S = float(self.cell_size)
+                cells = {}
+                for k in range(len(xs)):
+                        key = (int(math.floor(xs[k] / S)), int(math.floor(ys[k] / S)))
+                        bucket = cells.get(key)
+                        if bucket is None:
+                                cells[key] = [k]
+                        else:
+                                bucket.append(k)
+                self.cells = cells
+                return cells
+
+        #Yields every pair of bodies, as (a, b) with a < b, that are in the same or in neighbouring cells.
+        def candidate_pairs(self):
+                cells = self.cells
+                for (i, j), bucket in cells.items():
+                        n = len(bucket)
+                        for p in range(n):
+                                for q in range(p + 1, n):
+                                        a, b = bucket[p], bucket[q]
+                                        yield (a, b) if a < b else (b, a)
+                        for di, dj in NEIGHBOURS:
+                                other = cells.get((i + di, j + dj))
+                                if other is None:
+                                        continue
+                                for a in bucket:
+                                        for b in other:
+                                                yield (a, b) if a < b else (b, a)
+
+
+#Keeps track of which bodies touch. Bodies are given as parallel sequences of ids, positions and radii, and the
+#cell size should be at least twice the largest radius, so that touching bodies are always in neighbouring cells.
+class ContactTracker (object):
+        def __init__(self, cell_size=32):
+                self.hash = SpatialHash(cell_size)
+                self.contacts = set()
+                self.checks = 0
+
+        #Finds the contacts of this frame and returns them as three lists of id pairs: the contacts that have
+        #just begun, the ones that are still going on, and the ones that have just ended.
+        def update(self, ids, xs, ys, radii):
+                self.hash.build(xs, ys)
+                current = set()
+                checks = 0
+                for a, b in self.hash.candidate_pairs():
+                        checks += 1
+                        dx = xs[a] - xs[b]
+                        dy = ys[a] - ys[b]
+                        r = radii[a] + radii[b]
+                        if dx * dx + dy * dy < r * r:
+                                ia, ib = ids[a], ids[b]
+                                current.add((ia, ib) if ia < ib else (ib, ia))
+                self.checks = checks
+
+                previous = self.contacts
+                self.contacts = current
+                return sorted(current - previous), sorted(current & previous), sorted(previous - current)
+
+        def clear(self):
+                self.contacts = set()
+
+
+#Finds the contacts by comparing every pair of bodies, for reference.
+def brute_force(xs, ys, radii):
+        contacts = set()
+        n = len(xs)
+        for a in range(n):
+                for b in range(a + 1, n):
+                        dx = xs[a] - xs[b]
+                        dy = ys[a] - ys[b]
+                        r = radii[a] + radii[b]
+                        if dx * dx + dy * dy < r * r:
+                                contacts.add((a, b))
+        return contacts
+
+
+#Times both methods for growing numbers of animals, spread out at the density of a herd on the meadow.
+def benchmark(counts=(125, 250, 500, 1000, 2000, 4000, 8000), density=1000 / 1200.0 ** 2, repeat=5, brute_force_limit=2000):
+        rng = random.Random(0)
+        print('%8s %14s %14s %12s %10s' % ('animals', 'hash (ms)', 'ms / animal', 'brute (ms)', 'contacts'))
+        results = []
+        for n in counts:
+                side = math.sqrt(n / density)
+                xs = [rng.uniform(0, side) for k in range(n)]
+                ys = [rng.uniform(0, side) for k in range(n)]
+                radii = [10.0] * n
+                ids = list(range(n))
+
+                tracker = ContactTracker()
+                start = time.perf_counter()
+                for r in range(repeat):
+                        tracker.update(ids, xs, ys, radii)
+                hashed = (time.perf_counter() - start) / repeat
+
+                brute = None
+                if n <= brute_force_limit:
+                        start = time.perf_counter()
+                        expected = brute_force(xs, ys, radii)
+                        brute = time.perf_counter() - start
+                        assert expected == tracker.contacts
+
+                results.append((n, hashed, brute))
+                print('%8d %14.3f %14.5f %12s %10d' % (n, 1000 * hashed, 1000 * hashed / n, '%.1f' % (1000 * brute) if brute is not None else '-', len(tracker.contacts)))
+        return results
+
+
+if __name__ == '__main__':
+        benchmark()
@@ -0,0 +1,242 @@
+"""
+The state of the dog, the wolf and the other animals, kept in small components apart from their nodes.
+
+Every animal is an entity made of components: where it is (Transform), how it moves (Kinematics), the phase
+of its running animation (Gait), its health (Health) and how it leaves paw prints (Tracks). The components
+are plain records with __slots__, so they are small and quick to read, and the game works on them rather
+than on the nodes, each of whose attributes is an object in the scene graph. The systems of the entity store
+move and animate all its entities in turn, and once per step sync() writes to the nodes only the values which
+have changed since they were last written.
+
+What sets one kind of animal apart from another, its colours, its speed and the frequency of its paw prints,
+is a Species record, so a new kind of animal is a few lines of data:
+
+        FOX = Species('fox', body='#d2691e', head='#d2691e', ears='#8b4513', tail='#d2691e', max_speed=8)
+"""
+
+import math
+
+
+#A kind of animal. The colours are those of its body, head, ears, nose, tail and the tip of its tail.
+class Species (object):
+        def __init__(self, name, body, head, ears, nose='black', tail=None, tail_tip='white', max_speed=10, gait=15, radius=10, wags=False, health=None):
+                self.name = name
+                self.body = body
+                self.head = head
+                self.ears = ears
+                self.nose = nose
+                self.tail = tail if tail is not None else body
+                self.tail_tip = tail_tip
+                self.max_speed = max_speed
+                self.gait = gait #Controls with which frequency paw prints are made.
+                self.radius = radius
+                self.wags = wags
+                self.health = health
+
+DOG = Species('dog', body='brown', head='brown', ears='#a53e11', max_speed=10, wags=True)
+WOLF = Species('wolf', body='gray', head='gray', ears='#b3b3b3', max_speed=7, health=100)
+SHEEP = Species('sheep', body='white', head='#333333', ears='#333333', tail_tip='white', max_speed=3, gait=25)
+
+
+class Transform (object):
+        __slots__ = ('x', 'y', 'rotation', 'node_x', 'node_y', 'node_rotation')
+
+        def __init__(self, x=0.0, y=0.0, rotation=0.0):
+                self.x = x
+                self.y = y
+                self.rotation = rotation
+                #The values last written to the node.
+                self.node_x = None
+                self.node_y = None
+                self.node_rotation = None
+
+#The velocity of an animal, in points per sixtieth of a second, and the same relative to its top speed (u, v),
+#which drives its running animation.
+class Kinematics (object):
+        __slots__ = ('vx', 'vy', 'u', 'v', 'max_speed')
+
+        def __init__(self, max_speed):
+                self.vx = 0.0
+                self.vy = 0.0
+                self.u = 0.0
+                self.v = 0.0
+                self.max_speed = max_speed
+
+#The running animation. sizes, offsets and wag are rows of the gait tables (see gait.py), which are shared
+#tuples, so a row that has not changed is the very same object.
+class Gait (object):
+        __slots__ = ('move_time', 'sizes', 'offsets', 'wag', 'node_sizes', 'node_offsets', 'node_wag')
+
+        def __init__(self, offsets, wag=(0, 0, 0)):
+                self.move_time = 0
+                self.sizes = None
+                self.offsets = offsets
+                self.wag = wag
+                self.node_sizes = None
+                self.node_offsets = offsets
+                self.node_wag = wag
+
+class Health (object):
+        __slots__ = ('value', 'label', 'label_value', 'label_rotation')
+
+        def __init__(self, value, label=None):
+                self.value = value
+                self.label = label
+                self.label_value = value
+                self.label_rotation = None
+
+class Tracks (object):
+        __slots__ = ('gait', 'radius')
+
+        def __init__(self, gait, radius):
+                self.gait = gait
+                self.radius = radius
+
+
+#An animal: its species, its components, and the node it is drawn with. The node is expected to be built like
+#the dog, with a head, ears, a nose and a three-part tail.
+class Entity (object):
+        __slots__ = ('species', 'node', 'transform', 'kinematics', 'gait', 'health', 'tracks')
+
+        def __init__(self, species, node, offsets):
+                self.species = species
+                self.node = node
+                self.transform = Transform()
+                self.kinematics = Kinematics(species.max_speed)
+                self.gait = Gait(offsets)
+                self.health = Health(species.health) if species.health is not None else None
+                self.tracks = Tracks(species.gait, species.radius)
+
+        #Puts the animal in place, on its node as well.
+        def place(self, x, y, rotation=None):
+                transform = self.transform
+                transform.x = x
+                transform.y = y
+                if rotation is not None:
+                        transform.rotation = rotation
+                self.sync()
+
+        #Takes the position and rotation of the node as they are, e.g. after the node was moved by the animal
+        #store (see herd.py).
+        def pull(self):
+                transform = self.transform
+                node = self.node
+                transform.x = transform.node_x = node.position.x
+                transform.y = transform.node_y = node.position.y
+                transform.rotation = transform.node_rotation = node.rotation
+
+        #Works out the animation for the velocity (u, v) relative to the top speed, as in gait.py: the animal
+        #turns to where it is going, and its gait moves on by dt, in sixtieths of a second. A standing animal
+        #keeps its last pose.
+        def animate(self, table, dt=1):
+                k = self.kinematics
+                u = k.u
+                v = k.v
+                if abs(u) > 0.05 or abs(v) > 0.05:
+                        gait = self.gait
+                        vel = min(math.sqrt(u * u + v * v), 0.7)
+                        t = gait.move_time + dt
+                        gait.move_time = t
+                        gait.sizes = table.sizes(t, vel)
+                        gait.offsets = table.offsets(vel)
+                        self.transform.rotation = math.atan2(v, u) - math.pi / 2
+
+        def wag(self, table, t):
+                self.gait.wag = table.wag(t)
+
+        #Writes the values which have changed since the last call to the node.
+        def sync(self):
+                node = self.node
+                transform = self.transform
+                if transform.x != transform.node_x or transform.y != transform.node_y:
+                        node.position = (transform.x, transform.y)
+                        transform.node_x = transform.x
+                        transform.node_y = transform.y
+                rotation = transform.rotation
+                if rotation != transform.node_rotation:
+                        node.rotation = rotation
+                        transform.node_rotation = rotation
+
+                gait = self.gait
+                sizes = gait.sizes
+                if sizes is not gait.node_sizes and sizes is not None:
+                        r_1, r_2, r_3, r_4, r_5, r_6, r_7 = sizes
+                        node.size = (r_1, r_1)
+                        node.head.size = (r_2, r_2)
+                        node.lear.size = (r_3, r_3)
+                        node.rear.size = (r_3, r_3)
+                        node.nose.size = (r_4, r_4)
+                        node.tail1.size = (r_5, r_5)
+                        node.tail2.size = (r_6, r_6)
+                        node.tail3.size = (r_7, r_7)
+                        gait.node_sizes = sizes
+                offsets = gait.offsets
+                wag = gait.wag
+                if offsets is not gait.node_offsets or wag is not gait.node_wag:
+                        head_y, tail1_y, tail2_y, tail3_y = offsets
+                        if offsets is not gait.node_offsets:
+                                node.head.position = (0, head_y)
+                        node.tail1.position = (wag[0], tail1_y)
+                        node.tail2.position = (wag[1], tail2_y)
+                        node.tail3.position = (wag[2], tail3_y)
+                        gait.node_offsets = offsets
+                        gait.node_wag = wag
+
+                health = self.health
+                if health is not None and health.label is not None:
+                        label = health.label
+                        if health.value != health.label_value:
+                                label.text = str(health.value)
+                                health.label_value = health.value
+                        #The label stays upright as the animal turns.
+                        if rotation != health.label_rotation:
+                                label.rotation = -rotation
+                                health.label_rotation = rotation
+
+
+#The entities moved and animated one by one, like the dog and the wolf. Herds of animals are moved all at once
+#by the animal store instead (see herd.py).
+class EntityStore (object):
+        def __init__(self):
+                self.entities = []
+                self.wagging = []
+
+        def __len__(self):
+                return len(self.entities)
+
+        def add(self, entity):
+                self.entities.append(entity)
+                if entity.species.wags:
+                        self.wagging.append(entity)
+                return entity
+
+        def remove(self, entity):
+                self.entities.remove(entity)
+                if entity in self.wagging:
+                        self.wagging.remove(entity)
+
+        #Moves every entity by its velocity over dt sixtieths of a second, keeping it within bound of the centre
+        #if it is given.
+        def integrate(self, bound=None, dt=1):
+                for entity in self.entities:
+                        transform = entity.transform
+                        k = entity.kinematics
+                        x = transform.x + k.vx * dt
+                        y = transform.y + k.vy * dt
+                        if bound is not None:
+                                x = max(-bound, min(bound, x))
+                                y = max(-bound, min(bound, y))
+                        transform.x = x
+                        transform.y = y
+
+        #Animates every entity over dt sixtieths of a second, and wags the tails of those that wag them at time t,
+        #in sixtieths of a second too.
+        def animate(self, table, t, dt=1):
+                for entity in self.entities:
+                        entity.animate(table, dt)
+                for entity in self.wagging:
+                        entity.wag(table, t)
+
+        def sync(self):
+                for entity in self.entities:
+                        entity.sync()
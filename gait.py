@@ -0,0 +1,161 @@
+"""
+Lookup tables for the running animation of the dog and the wolf.
+
+As an animal runs, its body parts grow and shrink in a periodic fashion, and stretch out the faster it runs
+(see Animal.move). All of these curves depend on two things only: the phase of the gait, which goes round once
+every 20 pi / (2 - speed) frames, and the speed. The tables below hold the sizes of the body, head, ears,
+nose and tail for a grid of phases and speeds, so a frame of animation is a lookup instead of five sines.
+The resolution of the grid is chosen so that no looked-up value is further than a given tolerance, in
+points, from the exact formula.
+
+Run this module to see the resolution, the error and the speed of the tables:
+
+        python gait.py
+"""
+
+import math
+import random
+import time
+
+import numpy
+
+TWO_PI = 2 * math.pi
+
+#The speed above which the animation no longer changes, see Animal.move.
+TOP_SPEED = 0.7
+
+
+#The exact formulas, as in Animal.move and Animal.wag_tail (see entities.py), for reference.
+def gait_sizes(t, vel):
+        f = 2 - vel
+        r_1 = 20 + (1 + vel) * math.sin(f * t / 10)
+        r_2 = 20 + (1 + vel) * math.sin(f * (t + 10) / 10)
+        r_3 = 7 * r_2 / 20
+        r_4 = 5 * r_2 / 20
+        r_5 = 7 + (0.25 + 0.5 * vel) * math.sin(f * (t - 10) / 5)
+        r_6 = 7 + (1 + vel) * math.sin(f * (t - 20) / 5)
+        r_7 = 7 + (1 + vel) * math.sin(f * (t - 30) / 5)
+        return (r_1, r_2, r_3, r_4, r_5, r_6, r_7)
+
+def gait_offsets(vel):
+        return (10 + 13 * vel, -9 - 5 * vel, -13 - 10 * vel, -17 - 15 * vel)
+
+def wag_offsets(t):
+        return (math.sin(0.1 * t), 3 * math.sin(0.1 * t - 1), 6 * math.sin(0.1 * t - 2))
+
+
+#The same sizes, worked out with NumPy for arrays of phases (f * t / 10, modulo 2 pi) and speeds.
+def _sizes_by_phase(phase, vel):
+        f = 2 - vel
+        a = 1 + vel
+        r_2 = 20 + a * numpy.sin(phase + f)
+        sizes = numpy.array([
+                20 + a * numpy.sin(phase),
+                r_2,
+                7 * r_2 / 20,
+                5 * r_2 / 20,
+                7 + (0.25 + 0.5 * vel) * numpy.sin(2 * phase - 2 * f),
+                7 + a * numpy.sin(2 * phase - 4 * f),
+                7 + a * numpy.sin(2 * phase - 6 * f)])
+        #The sizes along the last axis, as numpy.stack(..., axis=-1) would, which older versions of NumPy lack.
+        return sizes.transpose(list(range(1, sizes.ndim)) + [0])
+
+
+class GaitTable (object):
+        def __init__(self, tolerance=0.1, max_phases=4096, max_speeds=1025, samples=20000, seed=0):
+                self.tolerance = tolerance
+                rng = numpy.random.RandomState(seed)
+                self.check_phase = rng.uniform(0, TWO_PI, samples)
+                self.check_vel = rng.uniform(0, TOP_SPEED, samples)
+                self.check_sizes = _sizes_by_phase(self.check_phase, self.check_vel)
+
+                #The grid is refined, in whichever direction the error is largest, until the two errors together
+                #are within tolerance.
+                phases, speeds = 64, 9
+                while True:
+                        phase_error, speed_error = self.errors(phases, speeds)
+                        if phase_error + speed_error <= tolerance:
+                                break
+                        if phase_error >= speed_error and phases < max_phases:
+                                phases *= 2
+                        elif speeds < max_speeds:
+                                speeds = 2 * speeds - 1
+                        elif phases < max_phases:
+                                phases *= 2
+                        else:
+                                break
+                self.build(phases, speeds)
+                self.error = self.measure()
+
+                wag_phases = 64
+                while 6 * math.pi / wag_phases > tolerance and wag_phases < max_phases:
+                        wag_phases *= 2
+                self.wag_phases = wag_phases
+                self.wag_scale = wag_phases / TWO_PI
+                self.wag_table = [wag_offsets(10 * TWO_PI * k / wag_phases) for k in range(wag_phases)]
+
+        #The largest errors caused by rounding the phase and by rounding the speed to a grid of the given size.
+        def errors(self, phases, speeds):
+                p = numpy.round(self.check_phase * phases / TWO_PI) * TWO_PI / phases
+                s = numpy.round(self.check_vel * (speeds - 1) / TOP_SPEED) * TOP_SPEED / (speeds - 1)
+                phase_error = numpy.abs(_sizes_by_phase(p, self.check_vel) - self.check_sizes).max()
+                speed_error = numpy.abs(_sizes_by_phase(self.check_phase, s) - self.check_sizes).max()
+                return phase_error, speed_error
+
+        def build(self, phases, speeds):
+                self.phases = phases
+                self.speeds = speeds
+                self.phase_scale = phases / TWO_PI
+                self.speed_scale = (speeds - 1) / TOP_SPEED
+                phase = numpy.arange(phases) * TWO_PI / phases
+                vel = numpy.arange(speeds) * TOP_SPEED / (speeds - 1)
+                sizes = _sizes_by_phase(phase[None, :], vel[:, None])
+                #A flat list of tuples of plain floats is the quickest to index from Python.
+                self.size_table = [tuple(row) for row in sizes.reshape(-1, 7).tolist()]
+                self.offset_table = [gait_offsets(v) for v in vel.tolist()]
+
+        #The largest difference between the table and the exact formulas, over the check samples.
+        def measure(self):
+                looked_up = numpy.array([self.sizes_at_phase(p, v) for p, v in zip(self.check_phase.tolist(), self.check_vel.tolist())])
+                return float(numpy.abs(looked_up - self.check_sizes).max())
+
+        def sizes_at_phase(self, phase, vel):
+                p = int(phase * self.phase_scale + 0.5) % self.phases
+                s = int(vel * self.speed_scale + 0.5)
+                return self.size_table[s * self.phases + p]
+
+        #The sizes (r_1 to r_7 of the original Dog.move) at move time t and speed vel, which is at most TOP_SPEED.
+        def sizes(self, t, vel):
+                p = int((2 - vel) * t / 10 * self.phase_scale + 0.5) % self.phases
+                s = int(vel * self.speed_scale + 0.5)
+                return self.size_table[s * self.phases + p]
+
+        #The heights of the head and the three parts of the tail at speed vel.
+        def offsets(self, vel):
+                return self.offset_table[int(vel * self.speed_scale + 0.5)]
+
+        #The sideways positions of the three parts of the tail as it wags, at game time t.
+        def wag(self, t):
+                return self.wag_table[int(0.1 * t * self.wag_scale + 0.5) % self.wag_phases]
+
+        def memory(self):
+                return 8 * 7 * len(self.size_table) + 8 * 4 * len(self.offset_table) + 8 * 3 * len(self.wag_table)
+
+
+def main():
+        for tolerance in (0.5, 0.2, 0.1, 0.05):
+                table = GaitTable(tolerance)
+                print('tolerance %.2f: %d phases x %d speeds, error %.4f, about %d kB' % (tolerance, table.phases, table.speeds, table.error, table.memory() // 1024))
+
+        table = GaitTable()
+        rng = random.Random(0)
+        samples = [(rng.randint(0, 100000), rng.uniform(0, TOP_SPEED)) for k in range(100000)]
+        for name, func in (('formulas', gait_sizes), ('table', table.sizes)):
+                start = time.perf_counter()
+                for t, vel in samples:
+                        func(t, vel)
+                print('%-9s %.3f us per frame' % (name, 1e6 * (time.perf_counter() - start) / len(samples)))
+
+
+if __name__ == '__main__':
+        main()
@@ -0,0 +1,627 @@
+"""
+A headless stand-in for the parts of Pythonista's scene, ui and sound modules that A Dog's Life uses.
+
+It makes it possible to run the game on a plain computer without a screen or a motion sensor, e.g. for
+profiling, benchmarking and tuning. Call install() before importing ADogsLife, and this module will be
+used in place of scene, ui and sound:
+
+        import headless
+        headless.install()
+        import ADogsLife
+
+Nothing is drawn, but the scene graph, the actions and the frame loop behave like they do on the phone,
+and every frame the attached nodes are walked the way the renderer would walk them.
+"""
+
+import math
+import sys
+import types
+
+__all__ = ['Vector2', 'Vector3', 'Point', 'Size', 'Rect', 'Node', 'ShapeNode', 'SpriteNode', 'LabelNode', 'Scene',
+           'Texture', 'Action', 'gravity', 'run', 'ui', 'sound', 'PORTRAIT', 'LANDSCAPE', 'DEFAULT_ORIENTATION']
+
+PORTRAIT = 'portrait'
+LANDSCAPE = 'landscape'
+DEFAULT_ORIENTATION = PORTRAIT
+
+#The screen size of the iPhone the game was developed on, in points.
+SCREEN_SIZE = (375, 667)
+
+#The frame rate that the scene clock (Scene.t and Scene.dt) pretends to run at.
+FRAME_RATE = 60
+
+
+#A two-dimensional vector, supporting the arithmetic the game uses on positions and sizes.
+class Vector2 (object):
+        __slots__ = ('x', 'y')
+
+        def __init__(self, x=0.0, y=0.0):
+                self.x = x
+                self.y = y
+
+        def __iter__(self):
+                yield self.x
+                yield self.y
+
+        def __len__(self):
+                return 2
+
+        def __getitem__(self, i):
+                return (self.x, self.y)[i]
+
+        def __add__(self, other):
+                return self.__class__(self.x + other[0], self.y + other[1])
+
+        __radd__ = __add__
+
+        def __sub__(self, other):
+                return self.__class__(self.x - other[0], self.y - other[1])
+
+        def __rsub__(self, other):
+                return self.__class__(other[0] - self.x, other[1] - self.y)
+
+        def __mul__(self, k):
+                return self.__class__(self.x * k, self.y * k)
+
+        __rmul__ = __mul__
+
+        def __truediv__(self, k):
+                return self.__class__(self.x / k, self.y / k)
+
+        def __neg__(self):
+                return self.__class__(-self.x, -self.y)
+
+        def __abs__(self):
+                return math.sqrt(self.x * self.x + self.y * self.y)
+
+        def __eq__(self, other):
+                try:
+                        return self.x == other[0] and self.y == other[1]
+                except (TypeError, IndexError):
+                        return NotImplemented
+
+        def __ne__(self, other):
+                result = self.__eq__(other)
+                return result if result is NotImplemented else not result
+
+        __hash__ = None
+
+        def __repr__(self):
+                return '%s(%r, %r)' % (self.__class__.__name__, self.x, self.y)
+
+
+class Point (Vector2):
+        __slots__ = ()
+
+
+#A size is a vector whose components are also available as w and h.
+class Size (Vector2):
+        __slots__ = ()
+
+        @property
+        def w(self):
+                return self.x
+
+        @w.setter
+        def w(self, value):
+                self.x = value
+
+        @property
+        def h(self):
+                return self.y
+
+        @h.setter
+        def h(self, value):
+                self.y = value
+
+
+#The gravity vector, as returned by gravity().
+class Vector3 (object):
+        __slots__ = ('x', 'y', 'z')
+
+        def __init__(self, x=0.0, y=0.0, z=0.0):
+                self.x = x
+                self.y = y
+                self.z = z
+
+        def __iter__(self):
+                yield self.x
+                yield self.y
+                yield self.z
+
+        def __repr__(self):
+                return 'Vector3(%r, %r, %r)' % (self.x, self.y, self.z)
+
+
+class Rect (object):
+        __slots__ = ('x', 'y', 'w', 'h')
+
+        def __init__(self, x=0.0, y=0.0, w=0.0, h=0.0):
+                self.x = x
+                self.y = y
+                self.w = w
+                self.h = h
+
+        @property
+        def size(self):
+                return Size(self.w, self.h)
+
+        def intersects(self, other):
+                return (self.x < other.x + other.w and other.x < self.x + self.w and
+                        self.y < other.y + other.h and other.y < self.y + self.h)
+
+        def __iter__(self):
+                yield self.x
+                yield self.y
+                yield self.w
+                yield self.h
+
+        def __repr__(self):
+                return 'Rect(%r, %r, %r, %r)' % (self.x, self.y, self.w, self.h)
+
+
+#The motion sensor. By default the phone is lying flat and still, but any function returning an (x, y, z)
+#tuple can be plugged in with set_gravity_source(), e.g. a scripted tilt or a recorded input stream.
+def _flat():
+        return (0.0, 0.0, -1.0)
+
+_gravity_source = _flat
+
+def set_gravity_source(source):
+        global _gravity_source
+        _gravity_source = source if source is not None else _flat
+
+def gravity():
+        x, y, z = _gravity_source()
+        return Vector3(x, y, z)
+
+
+#Stand-ins for the parts of the ui module that are needed for building shape nodes and for drawing
+#images: ui.Path, ui.ImageContext and ui.set_color. Drawing does not produce any pixels, but the image
+#contexts count the shapes filled into them, so the cost of drawing is still paid in proportion.
+class Path (object):
+        def __init__(self, kind='path', x=0.0, y=0.0, w=0.0, h=0.0):
+                self.kind = kind
+                self.bounds = Rect(x, y, w, h)
+
+        @classmethod
+        def oval(cls, x, y, w, h):
+                return cls('oval', x, y, w, h)
+
+        @classmethod
+        def rect(cls, x, y, w, h):
+                return cls('rect', x, y, w, h)
+
+        def fill(self):
+                if _contexts:
+                        _contexts[-1].shapes += 1
+
+        def stroke(self):
+                if _contexts:
+                        _contexts[-1].shapes += 1
+
+        def __repr__(self):
+                return 'Path.%s%r' % (self.kind, tuple(self.bounds))
+
+
+class Image (object):
+        def __init__(self, w, h, shapes=0):
+                self.size = Size(w, h)
+                self.shapes = shapes
+
+
+_contexts = []
+
+class ImageContext (object):
+        def __init__(self, w, h, opaque=False, scale=0.0):
+                self.size = Size(w, h)
+                self.shapes = 0
+
+        def __enter__(self):
+                _contexts.append(self)
+                return self
+
+        def __exit__(self, *exc):
+                _contexts.remove(self)
+                return False
+
+        def get_image(self):
+                return Image(self.size.w, self.size.h, self.shapes)
+
+def set_color(color):
+        pass
+
+ui = types.ModuleType('ui')
+ui.Path = Path
+ui.Rect = Rect
+ui.Image = Image
+ui.ImageContext = ImageContext
+ui.set_color = set_color
+
+
+#Stand-in for the sound module. Effects are not played, only counted.
+sound = types.ModuleType('sound')
+sound.effects_played = 0
+
+def _play_effect(name, volume=0.5, pitch=1.0, pan=0.0, looping=False):
+        sound.effects_played += 1
+        return None
+
+sound.play_effect = _play_effect
+
+
+#Actions are small programs run on a node over time. Every action knows its duration and how to apply
+#itself at a given moment; sequences and groups are built from these.
+class Action (object):
+        def __init__(self, duration=0.0):
+                self.duration = duration
+
+        def start(self, node):
+                return None
+
+        def apply(self, node, elapsed, start):
+                pass
+
+        def _instantiate(self):
+                return _ActionRun(self)
+
+        @staticmethod
+        def wait(duration):
+                return Action(duration)
+
+        @staticmethod
+        def rotate_by(radians, duration=0.5, timing_mode=None):
+                return _RotateBy(radians, duration)
+
+        @staticmethod
+        def rotate_to(radians, duration=0.5, timing_mode=None):
+                return _To('rotation', radians, duration)
+
+        @staticmethod
+        def fade_to(alpha, duration=0.5, timing_mode=None):
+                return _To('alpha', alpha, duration)
+
+        @staticmethod
+        def scale_to(scale, duration=0.5, timing_mode=None):
+                return _To('scale', scale, duration)
+
+        @staticmethod
+        def move_to(x, y, duration=0.5, timing_mode=None):
+                return _MoveTo(x, y, duration)
+
+        @staticmethod
+        def remove():
+                return _Call(lambda node: node.remove_from_parent())
+
+        @staticmethod
+        def call(func, duration=0.0):
+                return _Call(lambda node: func())
+
+        @staticmethod
+        def sequence(*actions):
+                if len(actions) == 1 and isinstance(actions[0], (list, tuple)):
+                        actions = actions[0]
+                return _Sequence(list(actions))
+
+        @staticmethod
+        def group(*actions):
+                if len(actions) == 1 and isinstance(actions[0], (list, tuple)):
+                        actions = actions[0]
+                return _Group(list(actions))
+
+
+class _RotateBy (Action):
+        def __init__(self, radians, duration):
+                Action.__init__(self, duration)
+                self.radians = radians
+
+        def start(self, node):
+                return node.rotation
+
+        def apply(self, node, elapsed, start):
+                f = min(1.0, elapsed / self.duration) if self.duration > 0 else 1.0
+                node.rotation = start + f * self.radians
+
+
+class _To (Action):
+        def __init__(self, attr, value, duration):
+                Action.__init__(self, duration)
+                self.attr = attr
+                self.value = value
+
+        def start(self, node):
+                return getattr(node, self.attr)
+
+        def apply(self, node, elapsed, start):
+                f = min(1.0, elapsed / self.duration) if self.duration > 0 else 1.0
+                setattr(node, self.attr, start + f * (self.value - start))
+
+
+class _MoveTo (Action):
+        def __init__(self, x, y, duration):
+                Action.__init__(self, duration)
+                self.target = (x, y)
+
+        def start(self, node):
+                return (node.position.x, node.position.y)
+
+        def apply(self, node, elapsed, start):
+                f = min(1.0, elapsed / self.duration) if self.duration > 0 else 1.0
+                node.position = (start[0] + f * (self.target[0] - start[0]), start[1] + f * (self.target[1] - start[1]))
+
+
+class _Call (Action):
+        def __init__(self, func):
+                Action.__init__(self, 0.0)
+                self.func = func
+
+        def apply(self, node, elapsed, start):
+                self.func(node)
+
+
+class _Sequence (Action):
+        def __init__(self, actions):
+                Action.__init__(self, sum(a.duration for a in actions))
+                self.actions = actions
+
+        def _instantiate(self):
+                return _SequenceRun(self)
+
+
+class _Group (Action):
+        def __init__(self, actions):
+                Action.__init__(self, max([a.duration for a in actions] or [0.0]))
+                self.actions = actions
+
+        def _instantiate(self):
+                return _GroupRun(self)
+
+
+#The running state of an action on a node. step() advances it and returns None while it is still running,
+#or the part of the time step that was left over once it has finished.
+class _ActionRun (object):
+        def __init__(self, action):
+                self.action = action
+                self.elapsed = 0.0
+                self.started = False
+                self.initial = None
+
+        def step(self, node, dt):
+                if not self.started:
+                        self.started = True
+                        self.initial = self.action.start(node)
+                self.elapsed += dt
+                self.action.apply(node, self.elapsed, self.initial)
+                if self.elapsed < self.action.duration:
+                        return None
+                return self.elapsed - self.action.duration
+
+
+class _SequenceRun (object):
+        def __init__(self, sequence):
+                self.runs = [a._instantiate() for a in sequence.actions]
+                self.index = 0
+
+        def step(self, node, dt):
+                while self.index < len(self.runs):
+                        dt = self.runs[self.index].step(node, dt)
+                        if dt is None:
+                                return None
+                        self.index += 1
+                return dt
+
+
+class _GroupRun (object):
+        def __init__(self, group):
+                self.runs = [a._instantiate() for a in group.actions]
+                self.left = 0.0
+
+        def step(self, node, dt):
+                running = []
+                for run in self.runs:
+                        left = run.step(node, dt)
+                        if left is None:
+                                running.append(run)
+                        else:
+                                self.left = left
+                self.runs = running
+                return None if running else self.left
+
+
+#Nodes with running actions, so that the frame loop does not have to search the scene graph for them.
+_animated_nodes = {}
+
+
+class Node (object):
+        def __init__(self, position=(0, 0), z_position=0.0, scale=1.0, alpha=1.0, parent=None, **kwargs):
+                self._position = Point(position[0], position[1])
+                self.z_position = z_position
+                self.scale = scale
+                self.alpha = alpha
+                self.rotation = 0.0
+                self.paused = False
+                self.parent = None
+                self.children = []
+                self._actions = {}
+                self._action_count = 0
+                for key, value in kwargs.items():
+                        setattr(self, key, value)
+                if parent is not None:
+                        parent.add_child(self)
+
+        @property
+        def position(self):
+                return self._position
+
+        @position.setter
+        def position(self, value):
+                self._position = Point(value[0], value[1])
+
+        @property
+        def scene(self):
+                node = self
+                while node.parent is not None:
+                        node = node.parent
+                return node if isinstance(node, Scene) else None
+
+        def add_child(self, node):
+                if node.parent is not None:
+                        node.remove_from_parent()
+                node.parent = self
+                self.children.append(node)
+                if node._actions:
+                        _animated_nodes[id(node)] = node
+
+        def remove_from_parent(self):
+                if self.parent is not None:
+                        self.parent.children.remove(self)
+                        self.parent = None
+
+        def run_action(self, action, key=None):
+                if key is None:
+                        self._action_count += 1
+                        key = ('_', self._action_count)
+                self._actions[key] = action._instantiate()
+                _animated_nodes[id(self)] = self
+
+        def remove_action(self, key):
+                self._actions.pop(key, None)
+
+        def remove_all_actions(self):
+                self._actions.clear()
+
+        def _step_actions(self, dt):
+                for key, run in list(self._actions.items()):
+                        if self._actions.get(key) is run and run.step(self, dt) is not None:
+                                if self._actions.get(key) is run:
+                                        del self._actions[key]
+                return bool(self._actions)
+
+
+class ShapeNode (Node):
+        def __init__(self, path=None, fill_color='white', stroke_color='clear', shadow=None, **kwargs):
+                self.path = path if path is not None else Path()
+                self.fill_color = fill_color
+                self.stroke_color = stroke_color
+                self.shadow = shadow
+                bounds = self.path.bounds
+                self._size = Size(bounds.w, bounds.h)
+                Node.__init__(self, **kwargs)
+
+        @property
+        def size(self):
+                return self._size
+
+        @size.setter
+        def size(self, value):
+                self._size = Size(value[0], value[1])
+
+
+class Texture (object):
+        def __init__(self, image):
+                self.image = image
+                self.size = Size(image.size.w, image.size.h)
+
+
+class SpriteNode (Node):
+        def __init__(self, texture=None, size=None, color='white', **kwargs):
+                self.texture = texture
+                self.color = color
+                if size is None:
+                        size = texture.size if texture is not None else (0, 0)
+                self._size = Size(size[0], size[1])
+                Node.__init__(self, **kwargs)
+
+        @property
+        def size(self):
+                return self._size
+
+        @size.setter
+        def size(self, value):
+                self._size = Size(value[0], value[1])
+
+
+class LabelNode (Node):
+        def __init__(self, text='', font=('Helvetica', 20), color='white', **kwargs):
+                self.text = text
+                self.font = font
+                self.color = color
+                Node.__init__(self, **kwargs)
+
+
+class Scene (Node):
+        def __init__(self, **kwargs):
+                Node.__init__(self, **kwargs)
+                self.size = Size(*SCREEN_SIZE)
+                self.background_color = 'black'
+                self.t = 0.0
+                self.dt = 0.0
+                self.rendered_nodes = 0
+
+        @property
+        def bounds(self):
+                return Rect(0, 0, self.size.w, self.size.h)
+
+        def setup(self):
+                pass
+
+        def update(self):
+                pass
+
+        def stop(self):
+                pass
+
+        #Sets the scene up the way run() does on the phone, before the first frame.
+        def _start(self, size=None):
+                if size is not None:
+                        self.size = Size(size[0], size[1])
+                self.t = 0.0
+                self.dt = 0.0
+                self.setup()
+
+        #Advances the scene by one frame: the update loop, then the actions, then the renderer.
+        def _step(self, dt):
+                self.update()
+                for key, node in list(_animated_nodes.items()):
+                        scene = node.scene
+                        if scene is None:
+                                #Detached nodes keep their actions, and are picked up again by add_child().
+                                _animated_nodes.pop(key, None)
+                        elif scene is self and not node._step_actions(dt):
+                                _animated_nodes.pop(key, None)
+                self.rendered_nodes = self._render()
+                self.dt = dt
+                self.t += dt
+
+        #Walks the attached scene graph like the renderer does, and returns the number of visible nodes.
+        def _render(self):
+                count = 0
+                stack = list(self.children)
+                while stack:
+                        node = stack.pop()
+                        if node.alpha <= 0:
+                                continue
+                        count += 1
+                        if node.children:
+                                stack.extend(node.children)
+                return count
+
+
+#Runs a scene for a number of frames as fast as possible. The orientation and display options of the real
+#run() are accepted and ignored.
+def run(scene, orientation=DEFAULT_ORIENTATION, frame_interval=1, anti_alias=False, show_fps=False, multi_touch=True, frames=600):
+        dt = float(frame_interval) / FRAME_RATE
+        scene._start()
+        for i in range(frames):
+                scene._step(dt)
+        return scene
+
+
+#Registers this module as scene, and its ui and sound stand-ins as ui and sound, so that the game's imports
+#pick them up.
+def install():
+        module = sys.modules[__name__]
+        sys.modules['scene'] = module
+        sys.modules['ui'] = ui
+        sys.modules['sound'] = sound
+        return module
@@ -0,0 +1,233 @@
+"""
+A vectorized store for many animals at once, e.g. a herd of sheep.
+
+Rather than every animal working out its own movement and animation with scalar maths, the state of all
+animals is kept in NumPy arrays, one per quantity (positions, velocities, gait, health and so on), and each
+frame is computed for all of them at once. Only the results are written back to the animals' nodes, and only
+for those near the screen.
+"""
+
+import math
+
+import numpy
+
+from scene import *
+
+
+#The arrays of the store, with their types. Each animal is one row.
+FIELDS = [
+        ('x', float), ('y', float),
+        ('vx', float), ('vy', float), #In points per sixtieth of a second.
+        ('u', float), ('v', float), #The velocity relative to the animal's top speed, which drives its animation.
+        ('max_speed', float),
+        ('gait', float),
+        ('radius', float),
+        ('move_time', float), #The phase of the gait animation.
+        ('health', float),
+        ('phase', float), #The offset into the wandering path, for animals that wander about on their own.
+        ('wanders', bool),
+        ('wags', bool),
+        ('culled', bool), #Whether the animal may be taken out of the scene when it is far from the screen.
+        ('attached', bool),
+]
+
+
+class AnimalStore (object):
+        def __init__(self, parent, capacity=16):
+                self.parent = parent
+                self.count = 0
+                self.nodes = []
+                self.labels = {}
+                for name, kind in FIELDS:
+                        setattr(self, name, numpy.zeros(capacity, dtype=kind))
+
+        def __len__(self):
+                return self.count
+
+        def grow(self, capacity):
+                for name, kind in FIELDS:
+                        old = getattr(self, name)
+                        new = numpy.zeros(capacity, dtype=kind)
+                        new[:self.count] = old[:self.count]
+                        setattr(self, name, new)
+
+        #Adds an animal node to the store, and returns its row. The node is expected to be built like the dog
+        #and the wolf, with a head, ears, a nose and a three-part tail.
+        def add(self, node, wanders=False, wags=False, culled=False, phase=0.0, health=100):
+                i = self.count
+                if i == len(self.x):
+                        self.grow(2 * len(self.x))
+                self.count += 1
+                self.nodes.append(node)
+                self.x[i] = node.position.x
+                self.y[i] = node.position.y
+                self.max_speed[i] = node.max_speed
+                self.gait[i] = node.gait
+                self.radius[i] = node.radius
+                self.move_time[i] = node.move_time
+                self.health[i] = health
+                self.phase[i] = phase
+                self.wanders[i] = wanders
+                self.wags[i] = wags
+                self.culled[i] = culled
+                self.attached[i] = node.parent is not None
+                label = getattr(node, 'health_label', None)
+                if label is not None:
+                        self.labels[i] = label
+                node.herd = self
+                node.herd_index = i
+                return i
+
+        #Puts the animal in row i at (x, y), for an animal that is moved from outside the store, e.g. the wolf
+        #along its path (see Wolf.seek).
+        def place(self, i, x, y):
+                self.x[i] = x
+                self.y[i] = y
+
+        #Sets the velocity of an animal that is steered from outside the store, like the dog and the wolf.
+        def drive(self, i, velocity, u, v):
+                self.vx[i] = velocity[0]
+                self.vy[i] = velocity[1]
+                self.u[i] = u
+                self.v[i] = v
+
+        #Works out the velocity of the animals that wander about on their own. Like the wolf, they follow a sum
+        #of sine waves, each animal at its own phase, and now and then they stop to graze.
+        def wander(self, t):
+                w = self.wanders[:self.count]
+                if not w.any():
+                        return
+                s = t + self.phase[:self.count][w]
+                speed = self.max_speed[:self.count][w]
+                graze = numpy.maximum(0, numpy.sin(s * 2 * math.pi / 900) + 0.2)
+                u = graze * (-0.7 * numpy.sin(s * 2 * math.pi / 700) + 0.3 * numpy.sin(s * 2 * math.pi / 400))
+                v = graze * (-0.7 * numpy.cos(s * 2 * math.pi / 2300) + 0.3 * numpy.cos(s * 2 * math.pi / 400))
+                self.u[:self.count][w] = u
+                self.v[:self.count][w] = v
+                self.vx[:self.count][w] = u * speed
+                self.vy[:self.count][w] = v * speed
+
+        #Moves every animal by its velocity over dt sixtieths of a second, keeping it within field_size of the
+        #centre if it is given.
+        def advance(self, field_size=None, dt=1):
+                n = self.count
+                x = self.x[:n]
+                y = self.y[:n]
+                x += self.vx[:n] * dt
+                y += self.vy[:n] * dt
+                if field_size is not None:
+                        numpy.clip(x, -field_size, field_size, out=x)
+                        numpy.clip(y, -field_size, field_size, out=y)
+
+        #The same animation as in Animal.move, for all animals at once, over dt sixtieths of a second. Returns
+        #the rows of the animals that are moving, and the sizes and offsets of their body parts.
+        def animate(self, dt=1):
+                n = self.count
+                u = self.u[:n]
+                v = self.v[:n]
+                moving = numpy.nonzero((numpy.abs(u) > 0.05) | (numpy.abs(v) > 0.05))[0]
+                u = u[moving]
+                v = v[moving]
+                ang = numpy.arctan2(v, u)
+                vel = numpy.minimum(numpy.hypot(u, v), 0.7)
+                f = 2 - vel
+                t = self.move_time[moving] + dt
+                self.move_time[moving] = t
+                a = 1 + vel
+                r_1 = 20 + a * numpy.sin(f * t / 10)
+                r_2 = 20 + a * numpy.sin(f * (t + 10) / 10)
+                r_5 = 7 + (0.25 + 0.5 * vel) * numpy.sin(f * (t - 10) / 5)
+                r_6 = 7 + a * numpy.sin(f * (t - 20) / 5)
+                r_7 = 7 + a * numpy.sin(f * (t - 30) / 5)
+                return moving, {
+                        'r_1': r_1, 'r_2': r_2, 'r_3': 7 * r_2 / 20, 'r_4': 5 * r_2 / 20, 'r_5': r_5, 'r_6': r_6, 'r_7': r_7,
+                        'rotation': ang - math.pi / 2, 'head_y': 10 + 13 * vel,
+                        'tail1_y': -9 - 5 * vel, 'tail2_y': -13 - 10 * vel, 'tail3_y': -17 - 15 * vel}
+
+        #The positions of all animals, e.g. before a step, for drawing them in between steps (see interpolate).
+        def positions(self):
+                n = self.count
+                return self.x[:n].copy(), self.y[:n].copy()
+
+        #Draws the animals in the scene a fraction alpha of the way from the given positions to where they are
+        #now. Their nodes are put back where they are by the next step, as it writes all their positions.
+        def interpolate(self, positions, alpha):
+                x_0, y_0 = positions
+                rows = numpy.nonzero(self.attached[:len(x_0)])[0]
+                x_0 = x_0[rows]
+                y_0 = y_0[rows]
+                x = (x_0 + (self.x[rows] - x_0) * alpha).tolist()
+                y = (y_0 + (self.y[rows] - y_0) * alpha).tolist()
+                nodes = self.nodes
+                for k, i in enumerate(rows.tolist()):
+                        nodes[i].position = (x[k], y[k])
+
+        #Attaches the culled animals near the viewport, given as (x0, y0, x1, y1), and detaches the others.
+        #Returns a mask of the animals whose nodes should be brought up to date.
+        def cull(self, viewport):
+                n = self.count
+                if viewport is None:
+                        return numpy.ones(n, dtype=bool)
+                x0, y0, x1, y1 = viewport
+                x = self.x[:n]
+                y = self.y[:n]
+                near = (x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)
+                show = near | ~self.culled[:n]
+                attached = self.attached[:n]
+                for i in numpy.nonzero(show != attached)[0]:
+                        if show[i]:
+                                self.parent.add_child(self.nodes[i])
+                        else:
+                                self.nodes[i].remove_from_parent()
+                attached[:] = show
+                return show
+
+        #Does a whole frame for the store: the wandering, the movement, the animation and writing the results
+        #back to the nodes. t is the game time, which drives both the wandering and the wagging of tails, and dt
+        #the length of the step, both in sixtieths of a second.
+        def step(self, t, field_size=None, viewport=None, dt=1):
+                if not self.count:
+                        return
+                self.wander(t)
+                self.advance(field_size, dt)
+                moving, parts = self.animate(dt)
+                self.sync(t, moving, parts, self.cull(viewport))
+
+        def sync(self, t, moving, parts, show):
+                nodes = self.nodes
+                x = self.x.tolist()
+                y = self.y.tolist()
+                rows = numpy.nonzero(show)[0].tolist()
+                for i in rows:
+                        nodes[i].position = (x[i], y[i])
+
+                wag = (math.sin(0.1 * t), 3 * math.sin(0.1 * t - 1), 6 * math.sin(0.1 * t - 2))
+                for i in numpy.nonzero(self.wags[:self.count] & show)[0].tolist():
+                        node = nodes[i]
+                        node.tail1.position = (wag[0], node.tail1.position.y)
+                        node.tail2.position = (wag[1], node.tail2.position.y)
+                        node.tail3.position = (wag[2], node.tail3.position.y)
+
+                visible = show[moving]
+                columns = [parts[name][visible].tolist() for name in ('r_1', 'r_2', 'r_3', 'r_4', 'r_5', 'r_6', 'r_7', 'rotation', 'head_y', 'tail1_y', 'tail2_y', 'tail3_y')]
+                move_time = self.move_time.tolist()
+                for k, i in enumerate(moving[visible].tolist()):
+                        r_1, r_2, r_3, r_4, r_5, r_6, r_7, rotation, head_y, tail1_y, tail2_y, tail3_y = [c[k] for c in columns]
+                        node = nodes[i]
+                        node.size = (r_1, r_1)
+                        node.head.size = (r_2, r_2)
+                        node.lear.size = (r_3, r_3)
+                        node.rear.size = (r_3, r_3)
+                        node.nose.size = (r_4, r_4)
+                        node.tail1.size = (r_5, r_5)
+                        node.tail2.size = (r_6, r_6)
+                        node.tail3.size = (r_7, r_7)
+                        node.rotation = rotation
+                        node.move_time = move_time[i]
+                        node.head.position = (0, head_y)
+                        node.tail1.position = (node.tail1.position.x, tail1_y)
+                        node.tail2.position = (node.tail2.position.x, tail2_y)
+                        node.tail3.position = (node.tail3.position.x, tail3_y)
+                        label = self.labels.get(i)
+                        if label is not None:
+                                label.rotation = -rotation
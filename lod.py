@@ -0,0 +1,103 @@
+"""
+Levels of detail for the nodes of the game: the animals, the flowers and the paw prints.
+
+A flower is seven shape nodes and an animal eight or nine, which is detail that cannot be seen when they are
+far from the middle of the screen, or when there are a great many of them. Every class of node that can be
+drawn with less detail says how many nodes it takes at each level, from the full detail at level 0 down to
+the least, in DETAIL_NODES, and changes level in set_detail(level), e.g. by taking its smallest parts out of
+the scene. The levels of the nodes are chosen by their distance from the middle of the screen, and then,
+while the nodes of all of them together are over the node budget, the furthest ones are brought down to the
+least detail, so that the cost of drawing a frame stays within the budget however far the view is zoomed
+out and however densely the meadow is filled.
+
+        lod = LevelOfDetail(distances=(250, 450), budget=400)
+        lod.add(flower)
+        ...
+        lod.update(x, y) #The middle of the screen, in the coordinates of the nodes.
+"""
+
+import numpy
+
+
+class LevelOfDetail (object):
+        #distances are the distances from the middle of the screen, in points, beyond which each level of detail
+        #after the first is used. budget is the most nodes the nodes added may take together, or None.
+        def __init__(self, distances=(250, 450), budget=None):
+                self.distances = numpy.asarray(distances, dtype=float)
+                self.budget = budget
+                self.nodes = []
+                self.rows = {} #From the id of a node to its index in nodes.
+                self.node_count = 0
+                self.demoted = 0
+
+        def __len__(self):
+                return len(self.nodes)
+
+        def add(self, node):
+                if id(node) not in self.rows:
+                        self.rows[id(node)] = len(self.nodes)
+                        self.nodes.append(node)
+
+        #Forgets a node, e.g. a flower of a chunk of the meadow that has been forgotten, and leaves it as it is.
+        def remove(self, node):
+                i = self.rows.pop(id(node), None)
+                if i is not None:
+                        last = self.nodes.pop()
+                        if i < len(self.nodes):
+                                self.nodes[i] = last
+                                self.rows[id(last)] = i
+
+        #The level of detail by distance alone for something at (x, y), with the middle of the screen at (cx, cy).
+        #scale is how much smaller than normal things look, e.g. 2 when the view is zoomed out twice.
+        def level_at(self, x, y, cx, cy, scale=1.0):
+                d = ((x - cx) ** 2 + (y - cy) ** 2) ** 0.5 * scale
+                return int(numpy.searchsorted(self.distances, d, side='right'))
+
+        #Chooses the level of detail of every node in the scene, with the middle of the screen at (cx, cy), and
+        #changes those whose level is not the one they are at. Returns the number of nodes changed.
+        def update(self, cx, cy, scale=1.0):
+                nodes = [node for node in self.nodes if node.parent is not None]
+                if not nodes:
+                        self.node_count = 0
+                        return 0
+                x = numpy.array([node.position.x for node in nodes])
+                y = numpy.array([node.position.y for node in nodes])
+                d = numpy.hypot(x - cx, y - cy) * scale
+                levels = numpy.searchsorted(self.distances, d, side='right')
+
+                #The number of nodes each node takes at each level, padded with its last level if it has fewer.
+                least = len(self.distances)
+                costs = numpy.array([self.node_costs(node, least + 1) for node in nodes])
+                r = numpy.arange(len(nodes))
+                levels = numpy.minimum(levels, numpy.array([len(node.DETAIL_NODES) - 1 for node in nodes]))
+                cost = costs[r, levels]
+                total = int(cost.sum())
+                self.demoted = 0
+                if self.budget is not None and total > self.budget:
+                        #The furthest nodes are brought down to the least detail first, until the rest fit.
+                        order = numpy.argsort(-d, kind='mergesort')
+                        savings = numpy.cumsum(cost[order] - costs[order, -1])
+                        k = min(int(numpy.searchsorted(savings, total - self.budget)) + 1, len(order))
+                        demoted = order[:k]
+                        total -= int(savings[k - 1])
+                        self.demoted = k
+                        levels[demoted] = [len(nodes[i].DETAIL_NODES) - 1 for i in demoted.tolist()]
+                self.node_count = total
+
+                changes = 0
+                for node, level in zip(nodes, levels.tolist()):
+                        if node.detail != level:
+                                node.set_detail(level)
+                                changes += 1
+                return changes
+
+        def node_costs(self, node, levels):
+                costs = list(node.DETAIL_NODES)
+                return costs + costs[-1:] * (levels - len(costs))
+
+        def stats(self):
+                levels = [0] * (len(self.distances) + 1)
+                for node in self.nodes:
+                        if node.parent is not None:
+                                levels[min(node.detail, len(levels) - 1)] += 1
+                return {'nodes': len(self.nodes), 'levels': levels, 'node_count': self.node_count, 'demoted': self.demoted, 'budget': self.budget}
@@ -0,0 +1,79 @@
+"""
+Baking of the static parts of the meadow, the flowers, the trees and the edge of the forest, into images.
+
+None of these ever move, so instead of keeping hundreds of shape nodes in the scene, they are drawn once,
+as the game is set up, into square tiles, each of which becomes a single sprite.
+"""
+
+import math
+
+from scene import *
+
+from shapes import screen_scale
+
+
+#A layer of static decorations at a given depth. Decorations are added with their centre, their size and a
+#function which draws them into the current image context, centred on a given point. Note that the y axis
+#of images points down, while that of the scene points up. Calling bake() draws the decorations into tiles
+#of tile_size points and adds one sprite per tile that has something in it to the parent node. The tiles are
+#drawn at scale pixels per point, that of the screen by default, so they are as sharp as the shape nodes they
+#stand in for. A tile holds 4 * (tile_size * scale) ** 2 bytes, so a lower scale saves memory where it is short.
+class StaticLayer (object):
+        def __init__(self, parent, z_position=0, tile_size=512, scale=None):
+                self.parent = parent
+                self.z_position = z_position
+                self.tile_size = tile_size
+                self.scale = scale if scale is not None else screen_scale()
+                self.items = []
+                self.tiles = {}
+
+        def add(self, x, y, w, h, draw):
+                self.items.append((x, y, w, h, draw))
+
+        #Returns the tiles, as (column, row) pairs, which the rectangle from (x0, y0) to (x1, y1) overlaps.
+        def tiles_for(self, x0, y0, x1, y1):
+                S = self.tile_size
+                for i in range(int(math.floor(x0 / S)), int(math.floor(x1 / S)) + 1):
+                        for j in range(int(math.floor(y0 / S)), int(math.floor(y1 / S)) + 1):
+                                yield (i, j)
+
+        def bake(self):
+                S = self.tile_size
+                contents = {}
+                for item in self.items:
+                        x, y, w, h, draw = item
+                        for tile in self.tiles_for(x - w / 2, y - h / 2, x + w / 2, y + h / 2):
+                                contents.setdefault(tile, []).append(item)
+
+                for (i, j), items in contents.items():
+                        with ui.ImageContext(S, S, scale=self.scale) as ctx:
+                                for x, y, w, h, draw in items:
+                                        draw(x - i * S, (j + 1) * S - y)
+                                image = ctx.get_image()
+                        sprite = SpriteNode(Texture(image), parent=self.parent)
+                        sprite.position = ((i + 0.5) * S, (j + 0.5) * S)
+                        sprite.z_position = self.z_position
+                        self.tiles[(i, j)] = sprite
+
+                self.items = []
+                return list(self.tiles.values())
+
+        #The memory taken by the images of the tiles, in bytes.
+        def memory(self):
+                pixels = self.tile_size * self.scale
+                return int(4 * pixels * pixels) * len(self.tiles)
+
+        def clear(self):
+                for sprite in self.tiles.values():
+                        sprite.remove_from_parent()
+                self.tiles = {}
+
+
+#Helpers for drawing simple shapes into the current image context, centred on (x, y).
+def fill_oval(x, y, w, h, color):
+        ui.set_color(color)
+        ui.Path.oval(x - w / 2, y - h / 2, w, h).fill()
+
+def fill_rect(x, y, w, h, color):
+        ui.set_color(color)
+        ui.Path.rect(x - w / 2, y - h / 2, w, h).fill()
@@ -0,0 +1,95 @@
+"""
+A recycling pool for the paw prints the animals leave on the meadow.
+
+Paw prints are made several times per second and fade away after a moment. Rather than building new
+shape nodes for every print and removing them from the scene once they have faded, the pool keeps the
+faded prints in the scene, invisible, and hands them out again for the next print.
+"""
+
+from collections import deque
+
+from scene import *
+
+
+#The pool of paw prints. Every print is a sprite with a shared texture, given by the paw_texture method of the
+#animal for the level of detail of the print (see lod.py), so a faded print can be handed out again to any
+#animal, at any level, by giving it the texture asked for. At most capacity prints are ever made, visible or
+#not; when more are asked for, the oldest visible print is reused before it has finished fading. With a tween
+#scheduler (see tweens.py), the prints are faded by it, all at once; otherwise each print runs a fade action.
+class PawPrintPool (object):
+        def __init__(self, parent, capacity=200, fade_time=1.5, tweens=None):
+                self.parent = parent
+                self.capacity = capacity
+                self.fade_time = fade_time
+                self.tweens = tweens
+                self.fade = Action.fade_to(0, fade_time) #Actions can be run on any number of nodes, so one is enough.
+                self.fade_times = (0, fade_time)
+                self.fade_values = (1, 0)
+                self.free = []
+                self.live = deque()
+                self.hits = 0
+                self.misses = 0
+
+        #Returns a fresh paw print for the animal, at the given level of detail, made visible and starting to
+        #fade at time t.
+        def acquire(self, animal, t, detail=0):
+                self.reclaim(t)
+                texture = animal.paw_texture(detail)
+
+                if not self.free and len(self.live) >= self.capacity:
+                        self.release(self.live.popleft()[1])
+
+                if self.free:
+                        paw = self.free.pop()
+                        if paw.texture is not texture:
+                                paw.texture = texture
+                                paw.size = texture.size
+                        self.hits += 1
+                else:
+                        paw = SpriteNode(texture)
+                        self.parent.add_child(paw)
+                        self.misses += 1
+
+                paw.alpha = 1
+                if self.tweens is not None:
+                        self.tweens.run(paw, 'fade', 'alpha', self.fade_times, self.fade_values, t)
+                else:
+                        paw.run_action(self.fade, 'fade')
+                self.live.append((t + self.fade_time, paw))
+                return paw
+
+        #Moves the prints which have faded by time t back to the free list.
+        def reclaim(self, t):
+                live = self.live
+                while live and live[0][0] <= t:
+                        self.release(live.popleft()[1])
+
+        def release(self, paw):
+                if self.tweens is not None:
+                        self.tweens.cancel(paw, 'fade')
+                else:
+                        paw.remove_action('fade')
+                paw.alpha = 0
+                self.free.append(paw)
+
+        #Removes every print, visible or not, from the scene.
+        def clear(self):
+                for expiry, paw in self.live:
+                        if self.tweens is not None:
+                                self.tweens.cancel(paw, 'fade')
+                        paw.remove_from_parent()
+                for paw in self.free:
+                        paw.remove_from_parent()
+                self.live.clear()
+                self.free = []
+
+        def stats(self):
+                requests = self.hits + self.misses
+                return {
+                        'hits': self.hits,
+                        'misses': self.misses,
+                        'hit_rate': self.hits / requests if requests else 0.0,
+                        'live': len(self.live),
+                        'free': len(self.free),
+                        'capacity': self.capacity,
+                }
@@ -0,0 +1,211 @@
+"""
+A frame profiler for the game, which times every phase of Game.update.
+
+When the profiler is attached to a game, it wraps the methods making up the update loop (set_position,
+move_animals, animate_animals and so on) with timers, and records for every frame the time spent in each of
+them, the number of nodes in the scene and the change in the number of allocated memory blocks. The last few
+seconds of frames are kept in a ring buffer, and the timings of all frames in histograms. When it is detached,
+or never attached, the game runs its own methods untouched, so it costs nothing.
+
+        profiler = FrameProfiler()
+        profiler.attach(game)
+        ...
+        print(profiler.summary())
+        profiler.dump_folded('frames.folded') #For flamegraph.pl or speedscope.
+"""
+
+from bisect import bisect_right
+import sys
+import time
+
+import numpy
+
+from scene import *
+
+#The methods that are timed, as (owner, name), where owner is 'game' for methods of the game, and 'animals'
+#for methods of the dog and the wolf.
+PHASES = [
+        ('game', 'set_position'),
+        ('game', 'sample_input'),
+        ('game', 'move_animals'),
+        ('game', 'animate_animals'),
+        ('game', 'move_herd'),
+        ('game', 'leave_tracks'),
+        ('game', 'move_screen'),
+        ('animals', 'turn_head'),
+        ('game', 'wolf_collision'),
+        ('game', 'sync_nodes'),
+        ('game', 'update_detail'),
+        ('game', 'update_tweens'),
+]
+
+#The upper edges of the histogram buckets, in milliseconds. The last bucket holds everything slower.
+BUCKETS = [0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 16.6, 33.3, 100]
+
+#The time available for a frame at 60 FPS, in milliseconds.
+FRAME_BUDGET = 1000 / 60.0
+
+
+#Counts the nodes in the scene graph below a node.
+def count_nodes(node):
+        count = 0
+        stack = list(node.children)
+        while stack:
+                node = stack.pop()
+                count += 1
+                stack.extend(node.children)
+        return count
+
+
+class FrameProfiler (object):
+        def __init__(self, capacity=600, phases=PHASES, count_nodes=True, budget=FRAME_BUDGET):
+                self.capacity = capacity
+                self.phases = [name for owner, name in phases]
+                self.owners = dict((name, owner) for owner, name in phases)
+                self.count_nodes = count_nodes
+                self.budget = budget
+                self.game = None
+                self.wrapped = []
+                self.overlay = None
+                self.overlay_interval = 30
+
+                #Column 0 is the whole frame, and column 1 + k the phase k.
+                self.times = numpy.zeros((capacity, len(self.phases) + 1))
+                self.nodes = numpy.zeros(capacity, dtype=int)
+                self.allocations = numpy.zeros(capacity, dtype=int)
+                self.frames = 0
+                self.histograms = [[0] * (len(BUCKETS) + 1) for k in range(len(self.phases) + 1)]
+                self.totals = [0.0] * (len(self.phases) + 1)
+                self.current = [0.0] * (len(self.phases) + 1)
+
+        #Wraps the update loop of the game, and the methods of its dog and wolf, with timers.
+        def attach(self, game):
+                self.detach()
+                self.game = game
+                self.wrap(game, 'update', self.timed_frame)
+                animals = [game.dog, game.wolf]
+                for k, name in enumerate(self.phases):
+                        owners = [game] if self.owners[name] == 'game' else animals
+                        for owner in owners:
+                                if hasattr(owner, name):
+                                        self.wrap(owner, name, lambda func, k=k: self.timed_phase(k + 1, func))
+
+        def wrap(self, owner, name, make_wrapper):
+                setattr(owner, name, make_wrapper(getattr(owner, name)))
+                self.wrapped.append((owner, name))
+
+        #Puts the game's own methods back.
+        def detach(self):
+                for owner, name in self.wrapped:
+                        if name in owner.__dict__:
+                                delattr(owner, name)
+                self.wrapped = []
+                self.hide_overlay()
+                self.game = None
+
+        def timed_phase(self, column, func):
+                current = self.current
+                clock = time.perf_counter
+                def wrapper(*args, **kwargs):
+                        start = clock()
+                        try:
+                                return func(*args, **kwargs)
+                        finally:
+                                current[column] += clock() - start
+                return wrapper
+
+        def timed_frame(self, func):
+                clock = time.perf_counter
+                def wrapper(*args, **kwargs):
+                        for k in range(len(self.current)):
+                                self.current[k] = 0.0
+                        blocks = sys.getallocatedblocks()
+                        start = clock()
+                        try:
+                                return func(*args, **kwargs)
+                        finally:
+                                self.current[0] = clock() - start
+                                self.record(sys.getallocatedblocks() - blocks)
+                return wrapper
+
+        def record(self, allocations):
+                row = self.frames % self.capacity
+                for k, seconds in enumerate(self.current):
+                        ms = 1000 * seconds
+                        self.times[row, k] = ms
+                        self.totals[k] += ms
+                        self.histograms[k][bisect_right(BUCKETS, ms)] += 1
+                self.nodes[row] = count_nodes(self.game) if self.count_nodes else 0
+                self.allocations[row] = allocations
+                self.frames += 1
+                if self.overlay is not None:
+                        if self.frames % self.overlay_interval == 0:
+                                self.update_overlay()
+                        self.place_overlay()
+
+        #The frames in the ring buffer, oldest first, as the times (frames x columns), nodes and allocations.
+        def recent(self):
+                n = min(self.frames, self.capacity)
+                order = numpy.arange(self.frames - n, self.frames) % self.capacity
+                return self.times[order], self.nodes[order], self.allocations[order]
+
+        def columns(self):
+                return ['frame'] + self.phases
+
+        #A table with, for every phase, the mean, median, 95th percentile and worst times over the frames in the
+        #ring buffer, and its share of the time of all frames so far.
+        def summary(self):
+                times, nodes, allocations = self.recent()
+                if not len(times):
+                        return 'No frames recorded.'
+                lines = ['%-16s %9s %9s %9s %9s %7s' % ('phase (ms)', 'mean', 'median', 'p95', 'max', 'share')]
+                rows = [(0, 'frame')] + sorted(enumerate(self.phases, 1), key=lambda kn: -self.totals[kn[0]])
+                for k, name in rows:
+                        column = times[:, k]
+                        share = self.totals[k] / self.totals[0] if self.totals[0] else 0.0
+                        lines.append('%-16s %9.4f %9.4f %9.4f %9.4f %6.1f%%' % (name, column.mean(), numpy.median(column), numpy.percentile(column, 95), column.max(), 100 * share))
+                other = times[:, 0] - times[:, 1:].sum(axis=1)
+                lines.append('%-16s %9.4f' % ('(other)', other.mean()))
+                over = int((times[:, 0] > self.budget).sum())
+                lines.append('')
+                lines.append('%d frames recorded, %d of the last %d over the %.1f ms budget' % (self.frames, over, len(times), self.budget))
+                lines.append('nodes: mean %.0f, max %d; allocated blocks per frame: mean %+.1f, max %+d' % (nodes.mean(), nodes.max(), allocations.mean(), allocations.max()))
+                return '\n'.join(lines)
+
+        #The histograms of all frames so far, as a dict from phase to a list of (upper edge in ms, count).
+        def histogram(self):
+                edges = BUCKETS + [float('inf')]
+                return dict((name, list(zip(edges, self.histograms[k]))) for k, name in enumerate(self.columns()))
+
+        #Writes the time of all frames so far in the folded stack format read by flame graph tools, one line
+        #per phase with its total time in microseconds.
+        def dump_folded(self, path):
+                other = self.totals[0] - sum(self.totals[1:])
+                with open(path, 'w') as f:
+                        for k, name in enumerate(self.phases, 1):
+                                f.write('update;%s %d\n' % (name, int(1000 * self.totals[k])))
+                        f.write('update %d\n' % max(0, int(1000 * other)))
+
+        #Shows the slowest phases of the last frames in the corner of the screen.
+        def show_overlay(self, interval=30):
+                self.overlay_interval = interval
+                if self.overlay is None and self.game is not None:
+                        self.overlay = LabelNode('', ('Menlo', 10), parent=self.game, color='white')
+                        self.overlay.z_position = 10
+                        self.overlay.anchor_point = (0, 1)
+
+        def hide_overlay(self):
+                if self.overlay is not None:
+                        self.overlay.remove_from_parent()
+                        self.overlay = None
+
+        def update_overlay(self):
+                times = self.recent()[0][-self.overlay_interval:].mean(axis=0)
+                slowest = sorted(range(1, len(times)), key=lambda k: -times[k])[:3]
+                text = 'frame %.2f ms\n' % times[0] + '\n'.join('%s %.2f' % (self.phases[k - 1], times[k]) for k in slowest)
+                self.overlay.text = text
+
+        #Keeps the overlay in the corner of the screen, which moves across the scene as it scrolls, every frame.
+        def place_overlay(self):
+                game = self.game
+                self.overlay.position = (-game.position.x + 8, -game.position.y + game.size.h - 8)
@@ -0,0 +1,162 @@
+"""
+Recording and replaying of games.
+
+A recording holds everything that makes a game turn out the way it did: the seed of the random numbers used to
+set the game up, the calibration of the phone's position from the first frame (see Game.set_position), and the
+smoothed gravity reading of every frame (see sensors.py), from which the calibration is adapted as it was. Played back, it gives exactly the same game, which makes bugs reproducible and
+gives benchmarks a fixed input.
+
+The file is append-only and made of fixed-width records, so it can be memory mapped and any frame found by
+arithmetic alone. After a fixed-size header, it is made up of blocks, each of a keyframe followed by the
+gravity readings of keyframe_interval frames. A keyframe holds the state of the game at the start of the first
+frame of its block, so seeking to a frame restores the keyframe before it and replays at most one block.
+
+        python replay.py info game.adlr
+"""
+
+import mmap
+import struct
+import sys
+
+import snapshot
+
+MAGIC = b'ADLR'
+VERSION = 4
+
+#magic, version, flags, seed, meadow seed, gx, gy, factor_x, factor_y, field size, screen width and height,
+#herd size, keyframe interval and steps per second.
+HEADER = struct.Struct('<4sHHQQ5d2d3I')
+
+#The gravity reading of a frame, x and y.
+FRAME = struct.Struct('<2d')
+
+FLAG_INFINITE_MEADOW = 1
+
+
+#The layout of a recording, worked out from its header.
+class Layout (object):
+        def __init__(self, herd_size, keyframe_interval):
+                self.herd_size = herd_size
+                self.keyframe_interval = keyframe_interval
+                self.keyframe_size = snapshot.size(herd_size)
+                self.block_size = self.keyframe_size + keyframe_interval * FRAME.size
+
+        def keyframe_offset(self, block):
+                return HEADER.size + block * self.block_size
+
+        def frame_offset(self, frame):
+                block, k = divmod(frame, self.keyframe_interval)
+                return self.keyframe_offset(block) + self.keyframe_size + k * FRAME.size
+
+        #The number of complete frames in a file of the given size.
+        def frames(self, size):
+                blocks, rest = divmod(size - HEADER.size, self.block_size)
+                return blocks * self.keyframe_interval + max(0, rest - self.keyframe_size) // FRAME.size
+
+
+#Records a game to a file. Attach it to a game after setup() and before its first frame.
+class Recorder (object):
+        def __init__(self, path, keyframe_interval=600):
+                self.path = path
+                self.keyframe_interval = keyframe_interval
+                self.file = None
+                self.frames = 0
+                self.layout = None
+
+        def attach(self, game):
+                game.recorder = self
+                self.game = game
+
+        def write_header(self, game):
+                flags = FLAG_INFINITE_MEADOW if game.INFINITE_MEADOW else 0
+                n = len(game.sheep_list)
+                self.layout = Layout(n, self.keyframe_interval)
+                self.file = open(self.path, 'wb')
+                self.file.write(HEADER.pack(MAGIC, VERSION, flags, game.seed, game.MEADOW_SEED or 0, game.gx, game.gy, game.factor_x, game.factor_y,
+                        game.FIELD_SIZE, game.size.w, game.size.h, n, self.keyframe_interval, game.STEP_RATE))
+
+        #Called by the game with the gravity reading of every frame, after the calibration of the first frame.
+        def record(self, game, x, y):
+                if self.file is None:
+                        self.write_header(game)
+                if self.frames % self.keyframe_interval == 0:
+                        self.file.write(snapshot.take(game))
+                self.file.write(FRAME.pack(x, y))
+                self.frames += 1
+
+        def close(self):
+                if self.file is not None:
+                        self.file.close()
+                        self.file = None
+
+
+#Plays a recording back. The file is memory mapped, so opening even a long recording is instant.
+class Replay (object):
+        def __init__(self, path):
+                self.path = path
+                self.file = open(path, 'rb')
+                self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+                (magic, version, self.flags, self.seed, self.meadow_seed, self.gx, self.gy, self.factor_x, self.factor_y,
+                        self.field_size, self.width, self.height, herd_size, keyframe_interval, self.step_rate) = HEADER.unpack_from(self.data, 0)
+                if magic != MAGIC or version != VERSION:
+                        raise ValueError('%s is not a version %d recording' % (path, VERSION))
+                self.layout = Layout(herd_size, keyframe_interval)
+                self.frames = self.layout.frames(len(self.data))
+
+        #Sets a new game up for the recording: its settings, and the seed of its random numbers. The frames of
+        #the recording are steps of the game, so it is played back at the step rate it was recorded at.
+        def configure(self, game):
+                game.SEED = self.seed
+                game.FIELD_SIZE = int(self.field_size) if self.field_size == int(self.field_size) else self.field_size
+                game.HERD_SIZE = self.layout.herd_size
+                game.INFINITE_MEADOW = bool(self.flags & FLAG_INFINITE_MEADOW)
+                if game.INFINITE_MEADOW:
+                        game.MEADOW_SEED = self.meadow_seed
+                game.STEP_RATE = self.step_rate
+                return game
+
+        #Makes the game take its input from the recording. Attach it after setup() and before the first frame.
+        def attach(self, game):
+                game.replay = self
+                game.gx = self.gx
+                game.gy = self.gy
+                game.factor_x = self.factor_x
+                game.factor_y = self.factor_y
+                game.calibrated = True
+
+        #The gravity reading of a frame, as (x, y). Past the end of the recording, the phone is held still.
+        def sample(self, frame):
+                if frame >= self.frames:
+                        return (self.gx, self.gy)
+                return FRAME.unpack_from(self.data, self.layout.frame_offset(frame))
+
+        #Brings the game to the start of the given frame, by restoring the keyframe before it and replaying
+        #the frames in between.
+        def seek(self, game, frame):
+                frame = max(0, min(frame, self.frames))
+                block = min(frame // self.layout.keyframe_interval, max(0, self.frames - 1) // self.layout.keyframe_interval)
+                snapshot.restore(game, self.data, self.layout.keyframe_offset(block))
+                while game.time < frame:
+                        game.step()
+
+        def close(self):
+                self.data.close()
+                self.file.close()
+
+
+def main(argv):
+        if len(argv) != 3 or argv[1] != 'info':
+                print('usage: python replay.py info RECORDING')
+                return
+        replay = Replay(argv[2])
+        print('seed:        %d' % replay.seed)
+        print('calibration: gx %.4f, gy %.4f, factors %.4f, %.4f' % (replay.gx, replay.gy, replay.factor_x, replay.factor_y))
+        print('field:       %g%s' % (replay.field_size, ' (endless meadow, seed %d)' % replay.meadow_seed if replay.flags & FLAG_INFINITE_MEADOW else ''))
+        print('screen:      %g x %g' % (replay.width, replay.height))
+        print('sheep:       %d' % replay.layout.herd_size)
+        print('frames:      %d, keyframe every %d, %d steps per second' % (replay.frames, replay.layout.keyframe_interval, replay.step_rate))
+        replay.close()
+
+
+if __name__ == '__main__':
+        main(sys.argv)
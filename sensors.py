@@ -0,0 +1,238 @@
+"""
+Sampling of the motion sensor for steering the dog, on a thread of its own and smoothed.
+
+The game steers the dog by the direction of gravity relative to the phone. Rather than reading the sensor on
+the thread that draws the screen, once per step, a sampler reads it on a background thread at a rate of its
+own, smooths every axis with a filter, and puts the smoothed samples into a ring buffer. The game takes the
+latest sample from the ring buffer whenever it needs one, which never waits for the sampler thread.
+
+The ring buffer is written by the sampler thread alone. Every slot holds an immutable tuple, and the count of
+samples is only raised once the slot has been written, so a reader always gets a whole sample, without a lock.
+
+Two filters are available: a plain low-pass filter, and the one-euro filter (Casiez, Roussel and Vogel,
+2012), a low-pass filter whose cutoff frequency rises with the speed of the signal, so that it removes the
+jitter of a phone that is held still, without lagging behind a phone that is tilted quickly.
+
+        sampler = SensorSampler(rate=100, smoothing='one_euro')
+        sampler.start()
+        x, y, z = sampler.read()
+        ...
+        sampler.stop()
+
+Without start(), every read() reads the sensor there and then, at the time given, which is what the headless
+simulations do (see simulate.py), so that they play the same way every time. headless.py stands in for the
+sensor on computers without one.
+"""
+
+import math
+import threading
+import time
+
+from scene import *
+
+
+#The smoothing factor of a low-pass filter with the given cutoff frequency, for samples dt seconds apart.
+def smoothing_factor(dt, cutoff):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+
+def _number(value):
+        return float('nan') if value is None else value
+
+def _none(value):
+        return None if math.isnan(value) else value
+
+
+#A low-pass filter with a fixed smoothing factor: each value moves alpha of the way to the new sample. Like the
+#one-euro filter, it starts over when the time goes backwards, e.g. when the game is rewound.
+class LowPassFilter (object):
+        def __init__(self, alpha=0.5):
+                self.alpha = alpha
+                self.reset()
+
+        def __call__(self, value, t):
+                if self.value is None or t < self.t:
+                        self.value = value
+                else:
+                        self.value += self.alpha * (value - self.value)
+                self.t = t
+                return self.value
+
+        def reset(self):
+                self.t = None
+                self.value = None
+
+        def state(self):
+                return (_number(self.t), _number(self.value), 0.0)
+
+        def set_state(self, state):
+                t, value, speed = state
+                self.t = _none(t)
+                self.value = _none(value)
+
+
+#The one-euro filter. min_cutoff is the cutoff frequency, in Hz, of a still signal: lower removes more
+#jitter. beta is how much the cutoff rises with the speed of the signal: higher lags less behind fast
+#movements. d_cutoff is the cutoff frequency the speed itself is smoothed with. When the time goes backwards,
+#e.g. when the game is rewound, the filter starts over from the new sample.
+class OneEuroFilter (object):
+        def __init__(self, min_cutoff=1.0, beta=5.0, d_cutoff=1.0):
+                self.min_cutoff = min_cutoff
+                self.beta = beta
+                self.d_cutoff = d_cutoff
+                self.reset()
+
+        def __call__(self, value, t):
+                if self.t is None or t < self.t:
+                        self.reset()
+                        self.t = t
+                        self.value = value
+                        return value
+                dt = t - self.t
+                if dt == 0:
+                        return self.value
+                self.t = t
+                speed = (value - self.value) / dt
+                self.speed += smoothing_factor(dt, self.d_cutoff) * (speed - self.speed)
+                cutoff = self.min_cutoff + self.beta * abs(self.speed)
+                self.value += smoothing_factor(dt, cutoff) * (value - self.value)
+                return self.value
+
+        def reset(self):
+                self.t = None
+                self.value = None
+                self.speed = 0.0
+
+        #The state of the filter as three numbers (t, value, speed), with NaN for what it does not have yet,
+        #e.g. for keeping it in a snapshot of the game.
+        def state(self):
+                return (_number(self.t), _number(self.value), self.speed)
+
+        def set_state(self, state):
+                t, value, speed = state
+                self.t = _none(t)
+                self.value = _none(value)
+                self.speed = speed
+
+FILTERS = {'one_euro': OneEuroFilter, 'low_pass': LowPassFilter}
+
+
+#A ring buffer of the last samples, each a tuple (t, x, y, z), written by one thread and read by any.
+class SampleRing (object):
+        def __init__(self, capacity=64):
+                self.capacity = capacity
+                self.slots = [None] * capacity
+                self.count = 0
+
+        def __len__(self):
+                return min(self.count, self.capacity)
+
+        def push(self, sample):
+                self.slots[self.count % self.capacity] = sample
+                self.count += 1
+
+        def latest(self):
+                count = self.count
+                return self.slots[(count - 1) % self.capacity] if count else None
+
+        #The last n samples, oldest first.
+        def recent(self, n):
+                count = self.count
+                n = min(n, count, self.capacity - 1)
+                return [self.slots[k % self.capacity] for k in range(count - n, count)]
+
+
+#The gravity vector of the scene module, as a tuple (x, y, z).
+def scene_gravity():
+        g = gravity()
+        return (g.x, g.y, g.z)
+
+
+class SensorSampler (object):
+        #source returns the raw sample (x, y, z). rate is the number of samples per second of the sampler
+        #thread, and smoothing the name of the filter of every axis (see FILTERS) or None, with its options.
+        def __init__(self, source=scene_gravity, rate=100, smoothing='one_euro', capacity=64, clock=time.perf_counter, **options):
+                self.source = source
+                self.rate = rate
+                self.clock = clock
+                self.filters = [FILTERS[smoothing](**options) for axis in range(3)] if smoothing is not None else None
+                self.ring = SampleRing(capacity)
+                self.thread = None
+                self.stopping = threading.Event()
+                self.errors = 0
+
+        @property
+        def running(self):
+                return self.thread is not None
+
+        #Reads the sensor once, at time t (the clock by default), and returns the smoothed sample (x, y, z).
+        def poll(self, t=None):
+                if t is None:
+                        t = self.clock()
+                x, y, z = self.source()
+                if self.filters is not None:
+                        fx, fy, fz = self.filters
+                        x = fx(x, t)
+                        y = fy(y, t)
+                        z = fz(z, t)
+                self.ring.push((t, x, y, z))
+                return (x, y, z)
+
+        #The latest smoothed sample (x, y, z). With the sampler thread running, this is the sample it took
+        #last, or the raw reading if it has not taken one yet; otherwise the sensor is read now, at time t.
+        def read(self, t=None):
+                if self.thread is not None:
+                        sample = self.ring.latest()
+                        return sample[1:] if sample is not None else tuple(self.source())
+                return self.poll(t)
+
+        #Starts reading the sensor on a background thread.
+        def start(self):
+                if self.thread is None:
+                        self.stopping.clear()
+                        self.thread = threading.Thread(target=self.run, name='sensor sampler')
+                        self.thread.daemon = True
+                        self.thread.start()
+
+        def run(self):
+                interval = 1.0 / self.rate
+                next_time = self.clock()
+                while not self.stopping.is_set():
+                        try:
+                                self.poll()
+                        except Exception:
+                                #The sensor may not be ready yet, e.g. before the scene is shown.
+                                self.errors += 1
+                        next_time += interval
+                        wait = next_time - self.clock()
+                        if wait > 0:
+                                self.stopping.wait(wait)
+                        else:
+                                next_time = self.clock() #Fallen behind, e.g. while the app was in the background.
+
+        def stop(self):
+                if self.thread is not None:
+                        self.stopping.set()
+                        self.thread.join()
+                        self.thread = None
+
+        def reset(self):
+                if self.filters is not None:
+                        for f in self.filters:
+                                f.reset()
+
+        #The state of the filters of the three axes, as nine numbers (see OneEuroFilter.state), all NaN
+        #without smoothing.
+        def state(self):
+                if self.filters is None:
+                        return (float('nan'),) * 9
+                return sum((f.state() for f in self.filters), ())
+
+        def set_state(self, state):
+                if self.filters is not None:
+                        for k, f in enumerate(self.filters):
+                                f.set_state(state[3 * k:3 * k + 3])
+
+        def stats(self):
+                return {'samples': self.ring.count, 'rate': self.rate, 'running': self.running, 'errors': self.errors}
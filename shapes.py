@@ -0,0 +1,82 @@
+"""
+A shared cache of the paths and textures the nodes of the game are made of.
+
+Every dog, wolf, flower and tree is built from ovals and rectangles of a handful of sizes, so instead of every
+node making its own ui.Path, they all share one path per shape and size. Shapes that are drawn as a whole,
+like paw prints, are drawn once into an image and shared as a texture. Paths and textures are kept until
+clear() is called, e.g. when the game is closed.
+
+        paw = ShapeNode(shapes.oval(5, 5), 'black')
+        print(shapes.SHAPES.stats())
+"""
+
+from scene import *
+
+#A rough size of a ui.Path of a single oval or rectangle, with its Objective-C object, in bytes.
+PATH_BYTES = 256
+
+
+#The pixels per point of the screen, taken to be 2 where the ui module cannot tell, e.g. headless.
+def screen_scale():
+        return getattr(ui, 'get_screen_scale', lambda: 2.0)()
+
+
+class ShapeCache (object):
+        def __init__(self):
+                self.paths = {}
+                self.textures = {}
+                self.hits = 0
+                self.misses = 0
+
+        #The path of an oval or a rectangle (kind 'oval' or 'rect') of the given size, with its corner at the origin.
+        def path(self, kind, w, h):
+                key = (kind, w, h)
+                path = self.paths.get(key)
+                if path is None:
+                        self.misses += 1
+                        path = ui.Path.oval(0, 0, w, h) if kind == 'oval' else ui.Path.rect(0, 0, w, h)
+                        self.paths[key] = path
+                else:
+                        self.hits += 1
+                return path
+
+        #A texture of w by h points, drawn by draw(x, y), which draws a shape centred on (x, y) into the current
+        #image context (see meadow.py). Textures are kept by key, e.g. the name and colour of the shape.
+        def texture(self, key, w, h, draw):
+                texture = self.textures.get(key)
+                if texture is None:
+                        self.misses += 1
+                        with ui.ImageContext(w, h) as ctx:
+                                draw(w / 2.0, h / 2.0)
+                                image = ctx.get_image()
+                        texture = Texture(image)
+                        self.textures[key] = texture
+                else:
+                        self.hits += 1
+                return texture
+
+        #The memory held by the cache, in bytes, with four bytes per pixel of the textures.
+        def memory(self):
+                scale = screen_scale()
+                pixels = sum(texture.size.w * texture.size.h for texture in self.textures.values())
+                return PATH_BYTES * len(self.paths) + int(4 * scale * scale * pixels)
+
+        def stats(self):
+                return {'paths': len(self.paths), 'textures': len(self.textures), 'hits': self.hits, 'misses': self.misses, 'bytes': self.memory()}
+
+        def clear(self):
+                self.paths = {}
+                self.textures = {}
+
+
+#The cache shared by all the nodes of the game.
+SHAPES = ShapeCache()
+
+def oval(w, h):
+        return SHAPES.path('oval', w, h)
+
+def rect(w, h):
+        return SHAPES.path('rect', w, h)
+
+def texture(key, w, h, draw):
+        return SHAPES.texture(key, w, h, draw)
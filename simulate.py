@@ -0,0 +1,159 @@
+"""
+Runs A Dog's Life headless, as fast as the CPU allows, and reports the frame rate of the whole simulation.
+
+        python simulate.py --frames 10000 --seed 1 --tilt circle
+
+The game is stepped through Game.setup() and Game.update() on the headless stand-in for the scene module
+(see headless.py), so this works on any computer with Python and NumPy.
+"""
+
+import argparse
+import math
+import random
+import time
+
+import numpy
+
+import headless
+
+headless.install()
+
+import ADogsLife
+from profiler import FrameProfiler
+from replay import Recorder, Replay
+
+
+#Scripted ways of holding the phone. Each takes the frame number and returns the gravity vector (x, y, z).
+def flat(frame):
+        return (0.0, 0.0, -1.0)
+
+#The phone is tilted around in a slow circle, so that the dog runs around in circles on the meadow.
+def circle(frame, amplitude=0.4, period=600):
+        a = 2 * math.pi * frame / period
+        return (amplitude * math.cos(a), amplitude * math.sin(a), -1.0)
+
+#The phone is tilted in a new random direction every second, like a restless player would do.
+def wander(frame, amplitude=0.6, interval=60, seed=0):
+        rng = random.Random(seed * 1000003 + frame // interval)
+        return (rng.uniform(-amplitude, amplitude), rng.uniform(-amplitude, amplitude), -1.0)
+
+TILTS = {'flat': flat, 'circle': circle, 'wander': wander}
+
+
+#The result of a simulation run, with the scene left in its final state for inspection.
+class SimulationResult (object):
+        def __init__(self, game, frames, setup_time, elapsed, profiler=None, frame_times=None):
+                self.game = game
+                self.profiler = profiler
+                self.frame_times = frame_times #The time of every frame, in seconds, if they were timed.
+                self.frames = frames
+                self.setup_time = setup_time
+                self.elapsed = elapsed
+                self.fps = frames / elapsed if elapsed > 0 else float('inf')
+
+        def __repr__(self):
+                return 'SimulationResult(frames=%d, setup=%.3fs, elapsed=%.3fs, fps=%.1f)' % (self.frames, self.setup_time, self.elapsed, self.fps)
+
+
+#Steps a game for the given number of frames without waiting for the display. The scene clock still runs
+#at the display rate (frame_interval / 60 seconds per frame), so actions such as the fading of paw prints
+#take as long as on the phone, and the game takes as many steps per frame as it would on a display of that
+#rate, e.g. two with a frame_interval of 2. The random module is seeded for reproducible runs. With profile, the
+#phases of every frame are timed by a frame profiler (see profiler.py), which is returned with the result.
+#With record, the game is recorded to the given path; with replay, a Replay (see replay.py), the game is
+#set up and played as recorded, and the tilt is ignored. The motion sensor is read once per step, at the time of
+#the step, so that a game plays the same way every time, unless sensor_thread is set, which reads it on the
+#sampler thread as on the phone (see sensors.py). With frame_times, every frame is timed on its own, e.g. for
+#the benchmarks (see bench.py).
+def simulate(frames=600, seed=None, tilt=flat, game=None, size=headless.SCREEN_SIZE, frame_interval=1, profile=False, record=None, replay=None, sensor_thread=False, frame_times=False):
+        if seed is not None:
+                random.seed(seed)
+        if game is None:
+                game = ADogsLife.Game()
+        if seed is not None and game.SEED is None:
+                game.SEED = seed
+        game.SENSOR_THREAD = sensor_thread
+        if replay is not None:
+                replay.configure(game)
+
+        frame = [0]
+        headless.set_gravity_source(lambda: tilt(frame[0]))
+        dt = float(frame_interval) / headless.FRAME_RATE
+
+        try:
+                start = time.perf_counter()
+                game._start(size)
+                setup_time = time.perf_counter() - start
+                if record is not None:
+                        Recorder(record).attach(game)
+                if replay is not None:
+                        replay.attach(game)
+
+                profiler = None
+                if profile:
+                        profiler = FrameProfiler(capacity=max(1, frames))
+                        profiler.attach(game)
+
+                times = None
+                start = time.perf_counter()
+                if frame_times:
+                        times = numpy.zeros(frames)
+                        clock = time.perf_counter
+                        for i in range(frames):
+                                frame[0] = i
+                                t = clock()
+                                game._step(dt)
+                                times[i] = clock() - t
+                else:
+                        for i in range(frames):
+                                frame[0] = i
+                                game._step(dt)
+                elapsed = time.perf_counter() - start
+        finally:
+                headless.set_gravity_source(None)
+                game.stop()
+
+        if profiler is not None:
+                profiler.detach()
+        return SimulationResult(game, frames, setup_time, elapsed, profiler, times)
+
+
+def main(argv=None):
+        parser = argparse.ArgumentParser(description='Run A Dog\'s Life headless and report its frame rate.')
+        parser.add_argument('--frames', type=int, default=3600, help='number of frames to simulate')
+        parser.add_argument('--seed', type=int, default=None, help='seed for the random module')
+        parser.add_argument('--tilt', choices=sorted(TILTS), default='circle', help='scripted way of holding the phone')
+        parser.add_argument('--width', type=float, default=headless.SCREEN_SIZE[0])
+        parser.add_argument('--height', type=float, default=headless.SCREEN_SIZE[1])
+        parser.add_argument('--profile', action='store_true', help='time every phase of the update loop')
+        parser.add_argument('--folded', metavar='PATH', help='with --profile, write a flame graph file')
+        parser.add_argument('--record', metavar='PATH', help='record the game to a file')
+        parser.add_argument('--replay', metavar='PATH', help='play a recorded game back instead of tilting the phone')
+        parser.add_argument('--sensor-thread', action='store_true', help='read the tilt on a background thread, as on the phone')
+        args = parser.parse_args(argv)
+
+        replay = None
+        size = (args.width, args.height)
+        if args.replay:
+                replay = Replay(args.replay)
+                size = (replay.width, replay.height)
+        result = simulate(args.frames, seed=args.seed, tilt=TILTS[args.tilt], size=size, profile=args.profile, record=args.record, replay=replay, sensor_thread=args.sensor_thread)
+        game = result.game
+        print('setup:   %.1f ms' % (1000 * result.setup_time))
+        print('frames:  %d in %.3f s' % (result.frames, result.elapsed))
+        print('fps:     %.1f' % result.fps)
+        print('nodes:   %d rendered in the last frame' % game.rendered_nodes)
+        print('dog:     (%.1f, %.1f)' % tuple(game.dog.position))
+        print('wolf:    (%.1f, %.1f), health %d' % (game.wolf.position.x, game.wolf.position.y, game.wolf.health))
+        if result.profiler is not None:
+                print('')
+                print(result.profiler.summary())
+                if args.folded:
+                        result.profiler.dump_folded(args.folded)
+        if replay is not None:
+                replay.close()
+        return result
+
+
+if __name__ == '__main__':
+        main()
@@ -0,0 +1,205 @@
+"""
+Snapshots of the state of a game, for resuming it, recovering it after a crash, or rewinding it.
+
+The meadow, the flowers and the trees follow from the seed the game was set up with, so a snapshot holds
+only the seed and what changes as the game is played: the game time, the camera and the calibration, the
+smoothing of the motion sensor, the dog and the wolf, and every sheep. It is a compact binary blob of fixed layout, a header and fixed-width
+blocks, with the sheep as a packed NumPy array, so a snapshot is written straight into a reusable buffer
+and read back without copying. Restoring a snapshot puts the values back into the game's existing nodes,
+so it takes a fraction of a millisecond, and a game can keep a snapshot every few seconds (see
+Game.SNAPSHOT_INTERVAL) without a hitch.
+
+        data = snapshot.take(game)
+        ...
+        snapshot.restore(game, data)
+
+Paw prints, which are only for show, are not kept, and a dog which was looking around starts doing so from
+the beginning.
+"""
+
+import os
+import struct
+
+import numpy
+
+MAGIC = b'ADLS'
+VERSION = 2
+
+FLAG_INFINITE_MEADOW = 1
+
+#magic, version, flags, seed, meadow seed, field size and herd size.
+HEADER = struct.Struct('<4sHHQQdI')
+
+#game time, scene time, the part of a step not yet simulated, the camera, and the calibration (gx, gy,
+#factor_x, factor_y).
+GAME = struct.Struct('<q8d')
+
+#The state of the filters smoothing the motion sensor, three numbers for each axis (see SensorSampler.state).
+SENSOR = struct.Struct('<9d')
+
+#For the dog and the wolf: position, rotation, move time, velocity and velocity relative to the top speed.
+ANIMAL = struct.Struct('<8d')
+
+#The wolf's own time along its path, its velocity along it, and its health.
+WOLF = struct.Struct('<q3d')
+
+SHEEP = numpy.dtype([('x', '<f8'), ('y', '<f8'), ('move_time', '<f8'), ('health', '<f8')])
+
+BODY = GAME.size + SENSOR.size + 2 * ANIMAL.size + WOLF.size
+
+
+#The size of a snapshot of a game with the given number of sheep, in bytes.
+def size(herd_size):
+        return HEADER.size + BODY + herd_size * SHEEP.itemsize
+
+def read_header(data, offset=0):
+        magic, version, flags, seed, meadow_seed, field_size, herd_size = HEADER.unpack_from(data, offset)
+        if magic != MAGIC or version != VERSION:
+                raise ValueError('not a version %d snapshot' % VERSION)
+        return {'flags': flags, 'seed': seed, 'meadow_seed': meadow_seed, 'field_size': field_size, 'herd_size': herd_size}
+
+
+#Writes a snapshot of the game into buffer at offset, or into a new buffer, and returns the buffer.
+def take(game, buffer=None, offset=0):
+        n = len(game.sheep_list)
+        if buffer is None:
+                buffer = bytearray(size(n))
+        flags = FLAG_INFINITE_MEADOW if game.INFINITE_MEADOW else 0
+        HEADER.pack_into(buffer, offset, MAGIC, VERSION, flags, game.seed, game.MEADOW_SEED or 0, game.FIELD_SIZE, n)
+        offset += HEADER.size
+        X, Y = game.camera_position()
+        GAME.pack_into(buffer, offset, game.time, game.t, game.accumulator, X, Y, game.gx, game.gy, game.factor_x, game.factor_y)
+        offset += GAME.size
+        SENSOR.pack_into(buffer, offset, *game.sensor.state())
+        offset += SENSOR.size
+        for animal in (game.dog, game.wolf):
+                transform = animal.transform
+                k = animal.kinematics
+                ANIMAL.pack_into(buffer, offset, transform.x, transform.y, transform.rotation, animal.move_time, k.vx, k.vy, k.u, k.v)
+                offset += ANIMAL.size
+        wolf = game.wolf
+        WOLF.pack_into(buffer, offset, wolf.time, wolf.speed_x, wolf.speed_y, wolf.health)
+        offset += WOLF.size
+
+        sheep = numpy.frombuffer(buffer, SHEEP, n, offset)
+        herd = game.herd
+        sheep['x'] = herd.x[:n]
+        sheep['y'] = herd.y[:n]
+        sheep['move_time'] = herd.move_time[:n]
+        sheep['health'] = herd.health[:n]
+        return buffer
+
+
+#Puts the game, which has been set up with the same seed and settings (see configure), in the state held by
+#the snapshot in data at offset.
+def restore(game, data, offset=0):
+        header = read_header(data, offset)
+        n = len(game.sheep_list)
+        if header['seed'] != game.seed or header['herd_size'] != n:
+                raise ValueError('the snapshot is of another game (seed %d, %d sheep)' % (header['seed'], header['herd_size']))
+        offset += HEADER.size
+        time, t, accumulator, X, Y, gx, gy, factor_x, factor_y = GAME.unpack_from(data, offset)
+        offset += GAME.size
+        game.time = time
+        game.accumulator = accumulator
+        game.position = (X, Y)
+        game.gx = gx
+        game.gy = gy
+        game.factor_x = factor_x
+        game.factor_y = factor_y
+        game.calibrated = True
+
+        #The smoothing of the sensor goes on from where it was, on the game time. A sampler thread reads the
+        #sensor on a clock of its own, so its filters start over from the next reading instead.
+        sensor = game.sensor
+        sensor.reset()
+        if not sensor.running:
+                sensor.set_state(SENSOR.unpack_from(data, offset))
+        offset += SENSOR.size
+
+        wolf = game.wolf
+        animals = (game.dog, wolf)
+        values = []
+        for animal in animals:
+                values.append(ANIMAL.unpack_from(data, offset))
+                offset += ANIMAL.size
+        wolf.time, wolf.speed_x, wolf.speed_y, health = WOLF.unpack_from(data, offset)
+        wolf.health = int(health)
+        offset += WOLF.size
+        for animal, (x, y, rotation, move_time, vx, vy, u, v) in zip(animals, values):
+                animal.place(x, y, rotation)
+                animal.move_time = move_time
+                k = animal.kinematics
+                k.vx = vx
+                k.vy = vy
+                k.u = u
+                k.v = v
+                game.tweens.cancel(animal.head, 'turn_head')
+                animal.head.rotation = 0
+                animal.turn_head_status = True
+
+        sheep = numpy.frombuffer(data, SHEEP, n, offset)
+        herd = game.herd
+        herd.x[:n] = sheep['x']
+        herd.y[:n] = sheep['y']
+        herd.move_time[:n] = sheep['move_time']
+        herd.health[:n] = sheep['health']
+        for animal in animals:
+                if animal.herd is not None:
+                        herd.move_time[animal.herd_index] = animal.move_time
+
+        game.reset_interpolation()
+        game.paw_pool.clear()
+        game.update_viewport()
+        game.prime_contacts()
+
+#Sets a new game up like the one in a snapshot: its settings, and the seed of its random numbers.
+def configure(game, data, offset=0):
+        header = read_header(data, offset)
+        game.SEED = header['seed']
+        field_size = header['field_size']
+        game.FIELD_SIZE = int(field_size) if field_size == int(field_size) else field_size
+        game.HERD_SIZE = header['herd_size']
+        game.INFINITE_MEADOW = bool(header['flags'] & FLAG_INFINITE_MEADOW)
+        if game.INFINITE_MEADOW:
+                game.MEADOW_SEED = header['meadow_seed']
+        return game
+
+
+#The last few snapshots of a game, kept in a single buffer which is allocated once, for rewinding.
+class SnapshotRing (object):
+        def __init__(self, herd_size, capacity=10):
+                self.size = size(herd_size)
+                self.capacity = capacity
+                self.buffer = bytearray(self.size * capacity)
+                self.count = 0
+
+        def __len__(self):
+                return min(self.count, self.capacity)
+
+        def take(self, game):
+                take(game, self.buffer, (self.count % self.capacity) * self.size)
+                self.count += 1
+
+        #The snapshot taken back snapshots before the last one, as a view of the buffer.
+        def get(self, back=0):
+                if not 0 <= back < len(self):
+                        raise IndexError('there are %d snapshots' % len(self))
+                k = (self.count - 1 - back) % self.capacity
+                return memoryview(self.buffer)[k * self.size:(k + 1) * self.size]
+
+        #Puts the game back to the snapshot taken back snapshots before the last one, and forgets the later ones.
+        def rewind(self, game, back=0):
+                restore(game, self.get(back))
+                self.count -= back
+
+        #Writes the last snapshot to a file, replacing it at once, so that a crash never leaves half a file.
+        def save(self, path):
+                temporary = path + '.tmp'
+                with open(temporary, 'wb') as f:
+                        f.write(self.get())
+                os.replace(temporary, path)
+
+def load(path):
+        with open(path, 'rb') as f:
+                return f.read()
@@ -0,0 +1,147 @@
+"""
+Spatial indexing for the meadow.
+
+SpatialGrid is a uniform grid which keeps track of which items are in which square cell of the world.
+ViewportCuller uses it to keep only the decorations near the screen attached to the scene, so that the
+cost of a frame depends on what can be seen rather than on how big the meadow is.
+"""
+
+import math
+
+
+#A uniform grid of square cells. Items are inserted with their centre and size, and are kept in every cell
+#their bounding box overlaps.
+class SpatialGrid (object):
+        def __init__(self, cell_size=256):
+                self.cell_size = cell_size
+                self.cells = {}
+
+        #Returns the range of cells, as (i0, j0, i1, j1) with both ends included, that the rectangle from
+        #(x0, y0) to (x1, y1) overlaps.
+        def cell_range(self, x0, y0, x1, y1):
+                S = float(self.cell_size)
+                return (int(math.floor(x0 / S)), int(math.floor(y0 / S)), int(math.floor(x1 / S)), int(math.floor(y1 / S)))
+
+        def insert(self, item, x, y, w, h):
+                i0, j0, i1, j1 = self.cell_range(x - w / 2, y - h / 2, x + w / 2, y + h / 2)
+                cells = []
+                for i in range(i0, i1 + 1):
+                        for j in range(j0, j1 + 1):
+                                self.cells.setdefault((i, j), []).append(item)
+                                cells.append((i, j))
+                return cells
+
+        def remove(self, item, cells):
+                for cell in cells:
+                        items = self.cells.get(cell)
+                        if items is not None and item in items:
+                                items.remove(item)
+                                if not items:
+                                        del self.cells[cell]
+
+        #Returns the items in the cells overlapping the rectangle, each of them once.
+        def query(self, x0, y0, x1, y1):
+                i0, j0, i1, j1 = self.cell_range(x0, y0, x1, y1)
+                found = {}
+                for i in range(i0, i1 + 1):
+                        for j in range(j0, j1 + 1):
+                                for item in self.cells.get((i, j), ()):
+                                        found[id(item)] = item
+                return list(found.values())
+
+        def __len__(self):
+                return len(self.cells)
+
+
+#Attaches and detaches nodes as the camera moves. A node is attached to the parent as long as any of the cells
+#it overlaps is within margin points of the viewport, and detached otherwise. The work is only done when the
+#viewport moves into a new row or column of cells, which with the default cell size is a few times a second
+#at the dog's top speed.
+class ViewportCuller (object):
+        def __init__(self, parent, cell_size=256, margin=100):
+                self.parent = parent
+                self.margin = margin
+                self.grid = SpatialGrid(cell_size)
+                self.visible_count = {}
+                self.visible_range = None
+                self.viewport = None
+                self.attached = 0
+
+        #Adds a node, which is detached until the next update shows that it is near the viewport.
+        def add(self, node, x, y, w, h):
+                self.grid.insert(node, x, y, w, h)
+                self.visible_count[id(node)] = 0
+                node.remove_from_parent()
+
+        #Returns True if the point is within the viewport, including the margin, at the last update, or within
+        #the given extra margin of it.
+        def contains(self, x, y, margin=0):
+                if self.visible_range is None:
+                        return True
+                x0, y0, x1, y1 = self.viewport
+                return x0 - margin <= x <= x1 + margin and y0 - margin <= y <= y1 + margin
+
+        #Updates the attached nodes for the viewport, given as the rectangle from (x0, y0) to (x1, y1) in the
+        #coordinates of the parent. Returns the number of nodes attached and detached.
+        def update(self, x0, y0, x1, y1):
+                m = self.margin
+                self.viewport = (x0 - m, y0 - m, x1 + m, y1 + m)
+                new_range = self.grid.cell_range(*self.viewport)
+                old_range = self.visible_range
+                if new_range == old_range:
+                        return 0
+
+                changes = 0
+                if old_range is not None:
+                        for cell in self.cells_in(old_range):
+                                if not self.in_range(cell, new_range):
+                                        changes += self.leave(cell)
+                for cell in self.cells_in(new_range):
+                        if old_range is None or not self.in_range(cell, old_range):
+                                changes += self.enter(cell)
+                self.visible_range = new_range
+                return changes
+
+        def cells_in(self, cell_range):
+                i0, j0, i1, j1 = cell_range
+                for i in range(i0, i1 + 1):
+                        for j in range(j0, j1 + 1):
+                                yield (i, j)
+
+        def in_range(self, cell, cell_range):
+                i0, j0, i1, j1 = cell_range
+                return i0 <= cell[0] <= i1 and j0 <= cell[1] <= j1
+
+        def enter(self, cell):
+                changes = 0
+                for node in self.grid.cells.get(cell, ()):
+                        count = self.visible_count[id(node)]
+                        if count == 0:
+                                self.parent.add_child(node)
+                                self.attached += 1
+                                changes += 1
+                        self.visible_count[id(node)] = count + 1
+                return changes
+
+        def leave(self, cell):
+                changes = 0
+                for node in self.grid.cells.get(cell, ()):
+                        count = self.visible_count[id(node)] - 1
+                        if count == 0:
+                                node.remove_from_parent()
+                                self.attached -= 1
+                                changes += 1
+                        self.visible_count[id(node)] = count
+                return changes
+
+        #Attaches every node again, e.g. before the meadow is rebuilt or inspected.
+        def clear(self):
+                for cell_nodes in self.grid.cells.values():
+                        for node in cell_nodes:
+                                if self.visible_count[id(node)] == 0:
+                                        self.parent.add_child(node)
+                                        self.visible_count[id(node)] = 1
+                self.grid = SpatialGrid(self.grid.cell_size)
+                self.visible_count = {}
+                self.visible_range = None
+                self.attached = 0
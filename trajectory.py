@@ -0,0 +1,154 @@
+"""
+The path of the wolf, worked out in closed form instead of frame by frame.
+
+The wolf's velocity (see Wolf.velocity) is a fixed sum of sine waves in its time counter, so the sum of its
+velocities over any number of frames has a closed form, and its position at any frame can be found directly.
+Where the wolf runs up against the edge of the field and is held there, the path is worked out once, frame by
+frame, until it starts repeating itself: the velocities repeat every 2800 frames across and every 9200 frames
+up and down, and sum to nothing over those periods, so after a few periods the clamped path repeats as well.
+From then on, any frame of the path is a lookup.
+
+All the methods take either a single tick (the number of frames from the start of the path) or a NumPy array
+of ticks, e.g. for previewing the path or for looking ahead. A path held within a bound only goes forwards
+from its start; to go back, build a path from an earlier state of the wolf.
+
+The periods of the waves are in sixtieths of a second, and the velocities in points per sixtieth of a second.
+At other step rates, step_length is the length of a frame in sixtieths of a second (see Game.STEP_RATE): the
+waves are sampled step_length apart, and the wolf moves step_length times its velocity in a frame.
+"""
+
+import math
+
+import numpy
+
+#The waves making up the wolf's velocity, as (amplitude, period in frames), with sines across and cosines up
+#and down, as in Wolf.velocity.
+X_WAVES = ((-5, 700), (2, 400))
+Y_WAVES = ((-5, 2300), (3, 400))
+
+
+#The number of frames after which all the waves repeat, to the nearest frame if they do not repeat exactly.
+def _period(waves, step_length=1.0):
+        period = 1
+        for amplitude, p in waves:
+                p = int(round(p / step_length))
+                period = period * p // math.gcd(period, p)
+        return period
+
+
+#The path along one axis. trig is numpy.sin or numpy.cos.
+class AxisPath (object):
+        def __init__(self, waves, trig, start, offset, bound=None, max_periods=16, step_length=1.0):
+                self.waves = waves
+                self.trig = trig
+                self.start = start
+                self.offset = offset
+                self.bound = bound
+                self.step_length = step_length
+                self.period = _period(waves, step_length)
+                self.transient = None
+                self.cycle = None
+                if bound is not None:
+                        self.settle(max_periods)
+
+        def velocity(self, ticks):
+                k = (numpy.asarray(ticks, dtype=float) + self.start) * self.step_length
+                v = 0.0
+                for amplitude, p in self.waves:
+                        v = v + amplitude * self.trig(k * 2 * math.pi / p)
+                return v
+
+        #The distance moved over the first n ticks, using sum(sin(a k + b), k < n) =
+        #sin(n a / 2) / sin(a / 2) * sin(b + (n - 1) a / 2), and the same with cos.
+        def distance(self, n):
+                n = numpy.asarray(n, dtype=float)
+                L = self.step_length
+                d = 0.0
+                for amplitude, p in self.waves:
+                        a = 2 * math.pi * L / p
+                        b = a * self.start
+                        d = d + amplitude * L * numpy.sin(n * a / 2) / math.sin(a / 2) * self.trig(b + (n - 1) * a / 2)
+                return d
+
+        def unclamped(self, ticks):
+                return self.offset + self.distance(ticks)
+
+        #Walks the clamped path a period at a time until it repeats. Periods in which the path does not reach
+        #the edge are done with a cumulative sum, the others frame by frame.
+        def settle(self, max_periods):
+                P = self.period
+                S = self.bound
+                x = min(S, max(-S, self.offset))
+                parts = []
+                starts = []
+                for n in range(max_periods):
+                        steps = self.velocity(numpy.arange(n * P, (n + 1) * P)) * self.step_length
+                        path = x + numpy.cumsum(steps)
+                        if path.min() >= -S and path.max() <= S:
+                                #The wolf never reaches the edge, so from here on the path repeats exactly.
+                                self.finish(parts, numpy.concatenate(([x], path[:-1])))
+                                return
+                        positions = numpy.empty(P)
+                        for k, step in enumerate(steps.tolist()):
+                                positions[k] = x
+                                x = min(S, max(-S, x + step))
+                        if x in starts:
+                                #The period starts where an earlier one did, so the path repeats from there.
+                                first = starts.index(x) + 1
+                                parts.append(positions)
+                                self.finish(parts[:first], numpy.concatenate(parts[first:]))
+                                return
+                        starts.append(x)
+                        parts.append(positions)
+                #The path has not settled; it is kept as it is, and the last period is taken to repeat.
+                self.finish(parts[:-1], parts[-1])
+
+        def finish(self, transient, cycle):
+                self.transient = numpy.concatenate(transient) if transient else numpy.empty(0)
+                self.cycle = cycle
+
+        #The position at the given ticks, or after the given number of frames from the start. Without a bound,
+        #ticks may be negative, for the path before the start. With one, they may not: where the wolf was held
+        #at the edge cannot be undone, so rewinding goes through a path built from an earlier state instead.
+        def position(self, ticks):
+                if self.bound is None:
+                        return self.unclamped(ticks)
+                n = numpy.asarray(ticks)
+                if (n < 0).any():
+                        raise ValueError('a bounded path has no positions before its start; build one from an earlier state')
+                L = len(self.transient)
+                if n.ndim == 0:
+                        n = int(n)
+                        return float(self.transient[n] if n < L else self.cycle[(n - L) % len(self.cycle)])
+                n = n.astype(int)
+                result = numpy.empty(n.shape)
+                early = n < L
+                result[early] = self.transient[n[early]]
+                result[~early] = self.cycle[(n[~early] - L) % len(self.cycle)]
+                return result
+
+
+#The path of a wolf which is at (x, y) when its time counter is at start. With a bound, the wolf is held within
+#bound of the centre of the field, as in Game.move_animals. Positions are those after the given number of frames.
+#The waves default to those of Wolf.velocity.
+class WolfTrajectory (object):
+        def __init__(self, x, y, start=0, bound=None, max_periods=16, x_waves=X_WAVES, y_waves=Y_WAVES, step_length=1.0):
+                self.start = start
+                self.bound = bound
+                self.x = AxisPath(x_waves, numpy.sin, start, x, bound, max_periods, step_length)
+                self.y = AxisPath(y_waves, numpy.cos, start, y, bound, max_periods, step_length)
+
+        def position(self, ticks):
+                return self.x.position(ticks), self.y.position(ticks)
+
+        #The velocity of the wolf at the given ticks, as returned by Wolf.velocity.
+        def velocity(self, ticks):
+                vx = self.x.velocity(ticks)
+                vy = self.y.velocity(ticks)
+                if numpy.ndim(vx) == 0:
+                        return float(vx), float(vy)
+                return vx, vy
+
+        #The whole path from the first tick to the last, e.g. for drawing it.
+        def preview(self, first, last, step=1):
+                return self.position(numpy.arange(first, last, step))
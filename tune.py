@@ -0,0 +1,287 @@
+"""
+Tuning of the wolf and the animals by batches of headless simulations, spread over all cores.
+
+The wolf's path and the dog's top speed were found by trial and error on the phone. This tool plays many games headless instead (see simulate.py), each with a different set of
+parameters, over a grid or at random, on a process pool. Each game is scored by a weighted sum of metrics,
+such as how much of the field the wolf covers, how long it is pinned against the edge, and how often the dog
+catches it, and the results are written, best first, to a columnar .npz file with an array per parameter and
+metric.
+
+        python tune.py --random 200 --frames 7200 --out wolf.npz
+        python tune.py --grid wolf_px1=500:900:5 --grid wolf_px2=300:500:5 --score coverage=1,pinned=-2
+        python tune.py --show wolf.npz
+
+The dog is driven by a scripted player which steers it towards the wolf, as a player would, with some
+random hesitation, so that the contact rate measures how hard the wolf is to catch.
+"""
+
+import argparse
+import itertools
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy
+
+import headless
+
+headless.install()
+
+import ADogsLife
+import simulate
+
+
+#The parameters that can be tuned, as name: (default, low, high, integer). wolf_ax1 and wolf_px1 are the
+#amplitude and period of the first wave of the wolf's velocity across, and so on (see Wolf.velocity). The
+#wolf's top speed is left out, as its speed comes from its waves alone, and so are the paw print frequencies,
+#which only space out the paw prints, as none of the metrics would tell their values apart.
+PARAMETERS = {
+        'wolf_ax1': (-5.0, -8.0, -2.0, False),
+        'wolf_px1': (700, 300, 1500, True),
+        'wolf_ax2': (2.0, 0.0, 4.0, False),
+        'wolf_px2': (400, 150, 800, True),
+        'wolf_ay1': (-5.0, -8.0, -2.0, False),
+        'wolf_py1': (2300, 800, 4000, True),
+        'wolf_ay2': (3.0, 0.0, 5.0, False),
+        'wolf_py2': (400, 150, 800, True),
+        'dog_max_speed': (10.0, 6.0, 14.0, False),
+}
+
+WOLF_PARAMETERS = ['wolf_ax1', 'wolf_px1', 'wolf_ax2', 'wolf_px2', 'wolf_ay1', 'wolf_py1', 'wolf_ay2', 'wolf_py2']
+
+
+#Puts a set of parameters into a game which has been set up.
+def apply(game, params):
+        p = dict((name, spec[0]) for name, spec in PARAMETERS.items())
+        p.update(params)
+        wolf = game.wolf
+        wolf.x_waves = ((p['wolf_ax1'], p['wolf_px1']), (p['wolf_ax2'], p['wolf_px2']))
+        wolf.y_waves = ((p['wolf_ay1'], p['wolf_py1']), (p['wolf_ay2'], p['wolf_py2']))
+        game.dog.kinematics.max_speed = p['dog_max_speed']
+
+
+#The positions of the dog and the wolf after every step of a game, and the health of the wolf at the end.
+class Trace (object):
+        def __init__(self, game, steps):
+                self.field_size = game.FIELD_SIZE
+                self.dog = numpy.zeros((steps, 2))
+                self.wolf = numpy.zeros((steps, 2))
+                self.steps = 0
+                self.start_health = game.wolf.health
+                self.health = game.wolf.health
+
+        def record(self, game):
+                if self.steps < len(self.wolf):
+                        self.dog[self.steps] = (game.dog.transform.x, game.dog.transform.y)
+                        self.wolf[self.steps] = (game.wolf.transform.x, game.wolf.transform.y)
+                        self.steps += 1
+                self.health = game.wolf.health
+
+
+#The metrics a game can be scored by. Each takes a trace and returns a number.
+
+#The share of the cells of a 20 x 20 grid over the field that the wolf has been in.
+def coverage(trace, cells=20):
+        S = trace.field_size
+        xy = trace.wolf[:trace.steps]
+        ij = numpy.clip(((xy + S) / (2 * S) * cells).astype(int), 0, cells - 1)
+        return len(set(map(tuple, ij.tolist()))) / float(cells * cells)
+
+#The share of the steps the wolf spends held against the edge of the field.
+def pinned(trace):
+        S = trace.field_size
+        xy = numpy.abs(trace.wolf[:trace.steps])
+        return float(((xy[:, 0] >= S) | (xy[:, 1] >= S)).mean()) if trace.steps else 0.0
+
+#The number of times the dog catches the wolf per minute of play.
+def contact_rate(trace):
+        minutes = trace.steps / 3600.0
+        return (trace.start_health - trace.health) / minutes if minutes else 0.0
+
+#The mean distance between the dog and the wolf, in points.
+def distance(trace):
+        d = trace.dog[:trace.steps] - trace.wolf[:trace.steps]
+        return float(numpy.hypot(d[:, 0], d[:, 1]).mean()) if trace.steps else 0.0
+
+#The mean speed of the wolf, in points per step.
+def wolf_speed(trace):
+        d = numpy.diff(trace.wolf[:trace.steps], axis=0)
+        return float(numpy.hypot(d[:, 0], d[:, 1]).mean()) if trace.steps > 1 else 0.0
+
+METRICS = {'coverage': coverage, 'pinned': pinned, 'contact_rate': contact_rate, 'distance': distance, 'wolf_speed': wolf_speed}
+
+DEFAULT_SCORE = {'coverage': 1.0, 'pinned': -1.0, 'contact_rate': 0.05}
+
+
+#A scripted player, who tilts the phone towards the wolf, with a moment's hesitation now and then. The phone
+#is held flat in the first frame, which calibrates the game.
+class Chaser (object):
+        def __init__(self, game, seed=0, strength=0.5, hesitation=0.3):
+                self.game = game
+                self.rng = random.Random(seed)
+                self.strength = strength
+                self.hesitation = hesitation
+                self.pause = 0
+
+        def __call__(self, frame):
+                if frame == 0 or self.game.time == 0:
+                        return (0.0, 0.0, -1.0)
+                if self.pause > 0:
+                        self.pause -= 1
+                        return (0.0, 0.0, -1.0)
+                if self.rng.random() < self.hesitation / 60.0:
+                        self.pause = self.rng.randint(30, 120)
+                dog = self.game.dog.transform
+                wolf = self.game.wolf.transform
+                dx = wolf.x - dog.x
+                dy = wolf.y - dog.y
+                d = math.hypot(dx, dy) or 1.0
+                return (self.strength * dx / d, self.strength * dy / d, -1.0)
+
+
+#Plays one game with the given parameters and returns its metrics. This runs in the worker processes.
+def run_trial(params, frames=3600, seed=0):
+        game = ADogsLife.Game()
+        game.SEED = seed
+        game.BAKE_STATIC = True
+        trace = [None]
+        step = game.step
+
+        def traced_step():
+                step()
+                trace[0].record(game)
+
+        def setup():
+                ADogsLife.Game.setup(game)
+                apply(game, params)
+                trace[0] = Trace(game, frames)
+                game.step = traced_step
+
+        game.setup = setup
+        simulate.simulate(frames, tilt=Chaser(game, seed), game=game)
+        return dict((name, metric(trace[0])) for name, metric in METRICS.items())
+
+
+#Plays a set of parameters with several seeds, and returns the mean of each metric.
+def run_trials(params, frames, seeds):
+        results = [run_trial(params, frames, seed) for seed in seeds]
+        return dict((name, sum(r[name] for r in results) / len(results)) for name in METRICS)
+
+
+def grid(ranges):
+        names = sorted(ranges)
+        for values in itertools.product(*[ranges[name] for name in names]):
+                yield dict(zip(names, values))
+
+def random_search(names, count, seed=0):
+        rng = numpy.random.RandomState(seed)
+        for k in range(count):
+                params = {}
+                for name in names:
+                        default, low, high, integer = PARAMETERS[name]
+                        value = rng.uniform(low, high)
+                        params[name] = int(round(value)) if integer else float(value)
+                yield params
+
+#Parses 'name=low:high:count' into the values of a grid axis.
+def parse_axis(text):
+        name, spec = text.split('=')
+        if name not in PARAMETERS:
+                raise ValueError('unknown parameter %s' % name)
+        low, high, count = spec.split(':')
+        values = numpy.linspace(float(low), float(high), int(count)).tolist()
+        if PARAMETERS[name][3]:
+                values = [int(round(v)) for v in values]
+        return name, values
+
+#Parses 'metric=weight,...' into the weights of the score.
+def parse_score(text):
+        weights = {}
+        for part in text.split(','):
+                name, weight = part.split('=')
+                if name not in METRICS:
+                        raise ValueError('unknown metric %s' % name)
+                weights[name] = float(weight)
+        return weights
+
+def score(metrics, weights):
+        return sum(weight * metrics[name] for name, weight in weights.items())
+
+
+#Plays every set of parameters on a pool of worker processes, and returns the results, best first, as columns:
+#an array per parameter, per metric, and for the score.
+def search(candidates, weights=DEFAULT_SCORE, frames=3600, seeds=(0,), workers=None):
+        candidates = list(candidates)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(run_trials, params, frames, list(seeds)) for params in candidates]
+                results = [future.result() for future in futures]
+
+        names = sorted(set(name for params in candidates for name in params))
+        scores = numpy.array([score(metrics, weights) for metrics in results])
+        order = numpy.argsort(-scores, kind='mergesort')
+        columns = {'score': scores[order], 'rank': numpy.arange(1, len(order) + 1)}
+        for name in names:
+                default = PARAMETERS[name][0]
+                columns[name] = numpy.array([params.get(name, default) for params in candidates])[order]
+        for name in METRICS:
+                columns[name] = numpy.array([metrics[name] for metrics in results])[order]
+        return columns
+
+def save(path, columns, weights):
+        columns = dict(columns)
+        columns['weights'] = numpy.array(['%s=%g' % item for item in sorted(weights.items())])
+        numpy.savez(path, **columns)
+
+def show(columns, top=10):
+        names = [name for name in sorted(columns) if name in PARAMETERS]
+        header = ['rank', 'score'] + names + sorted(METRICS)
+        print(' '.join('%12s' % name for name in header))
+        for k in range(min(top, len(columns['score']))):
+                print(' '.join('%12.4g' % columns[name][k] for name in header))
+
+
+def main(argv=None):
+        parser = argparse.ArgumentParser(description='Tune the wolf and the animals with batches of headless games.')
+        parser.add_argument('--grid', action='append', default=[], metavar='NAME=LOW:HIGH:COUNT', help='a grid axis; may be repeated')
+        parser.add_argument('--random', type=int, default=0, metavar='N', help='N random sets of parameters instead of a grid')
+        parser.add_argument('--vary', default=','.join(WOLF_PARAMETERS), help='the parameters varied by --random')
+        parser.add_argument('--score', default=','.join('%s=%g' % item for item in sorted(DEFAULT_SCORE.items())), help='weights of the metrics, e.g. coverage=1,pinned=-1')
+        parser.add_argument('--frames', type=int, default=3600, help='frames per game')
+        parser.add_argument('--seeds', type=int, default=2, help='games per set of parameters')
+        parser.add_argument('--workers', type=int, default=None, help='worker processes, one per core by default')
+        parser.add_argument('--seed', type=int, default=0, help='seed of the random search')
+        parser.add_argument('--out', default='tune.npz', help='the results file')
+        parser.add_argument('--top', type=int, default=10)
+        parser.add_argument('--show', metavar='PATH', help='show the results in a file instead')
+        args = parser.parse_args(argv)
+
+        if args.show:
+                with numpy.load(args.show) as data:
+                        show(dict(data), args.top)
+                return
+
+        weights = parse_score(args.score)
+        if args.grid:
+                candidates = list(grid(dict(parse_axis(axis) for axis in args.grid)))
+        elif args.random:
+                names = [name for name in args.vary.split(',') if name]
+                for name in names:
+                        if name not in PARAMETERS:
+                                parser.error('unknown parameter %s' % name)
+                candidates = [{}] + list(random_search(names, args.random, args.seed))
+        else:
+                candidates = [{}]
+
+        start = time.perf_counter()
+        columns = search(candidates, weights, args.frames, range(args.seeds), args.workers)
+        elapsed = time.perf_counter() - start
+        save(args.out, columns, weights)
+        print('%d sets of parameters, %d games of %d frames, in %.1f s on %d workers' % (len(candidates), len(candidates) * args.seeds, args.frames, elapsed, args.workers or os.cpu_count()))
+        show(columns, args.top)
+        print('written to %s' % args.out)
+
+
+if __name__ == '__main__':
+        main()
@@ -0,0 +1,142 @@
+"""
+A scheduler for the tweens of the game: the fading of paw prints, the turning of heads and the like.
+
+Rather than every paw print running its own action, all tweens live in one scheduler, which keeps their
+timelines in NumPy arrays, one row per tween, and works out the values of all of them at once every frame.
+A tween moves one attribute of a node (e.g. 'alpha' or 'rotation') along a timeline of keyframes, given as
+times from its start and the values at those times, in straight lines in between. Only values which have
+changed are written to the nodes. Like actions, tweens are run under a key, and a new tween under the key
+of a running one takes its place.
+
+        tweens = TweenScheduler()
+        tweens.run(paw, 'fade', 'alpha', (0, 1.5), (1, 0), t)
+        ...
+        tweens.update(t) #Every frame.
+"""
+
+import numpy
+
+
+class TweenScheduler (object):
+        def __init__(self, capacity=64, max_keys=8):
+                self.max_keys = max_keys
+                self.times = numpy.zeros((capacity, max_keys))
+                self.values = numpy.zeros((capacity, max_keys))
+                self.start = numpy.zeros(capacity)
+                self.last = numpy.full(capacity, numpy.nan) #The values last written to the nodes.
+                self.active = numpy.zeros(capacity, dtype=bool)
+                self.nodes = [None] * capacity
+                self.attributes = [None] * capacity
+                self.callbacks = [None] * capacity
+                self.slots = {} #From (id of the node, key) to the row of the tween.
+                self.keys = [None] * capacity
+                self.free = list(range(capacity - 1, -1, -1))
+
+        def __len__(self):
+                return len(self.slots)
+
+        def grow(self):
+                old = len(self.start)
+                new = 2 * old
+                for name in ('times', 'values'):
+                        array = numpy.zeros((new, self.max_keys))
+                        array[:old] = getattr(self, name)
+                        setattr(self, name, array)
+                start = numpy.zeros(new)
+                start[:old] = self.start
+                self.start = start
+                last = numpy.full(new, numpy.nan)
+                last[:old] = self.last
+                self.last = last
+                active = numpy.zeros(new, dtype=bool)
+                active[:old] = self.active
+                self.active = active
+                for name in ('nodes', 'attributes', 'callbacks', 'keys'):
+                        getattr(self, name).extend([None] * old)
+                self.free.extend(range(new - 1, old - 1, -1))
+
+        #Starts a tween of the given attribute of the node at time t. times are the times of the keyframes from
+        #the start, in increasing order, and values the values of the attribute at them. When the tween has
+        #finished, done is called, if given.
+        def run(self, node, key, attribute, times, values, t, done=None):
+                n = len(times)
+                if n != len(values) or not 1 <= n <= self.max_keys:
+                        raise ValueError('a tween needs between 1 and %d keyframes, with a value for each' % self.max_keys)
+                self.cancel(node, key)
+                if not self.free:
+                        self.grow()
+                i = self.free.pop()
+                self.times[i, :n] = times
+                self.times[i, n:] = times[-1]
+                self.values[i, :n] = values
+                self.values[i, n:] = values[-1]
+                self.start[i] = t
+                self.last[i] = numpy.nan
+                self.active[i] = True
+                self.nodes[i] = node
+                self.attributes[i] = attribute
+                self.callbacks[i] = done
+                self.keys[i] = (id(node), key)
+                self.slots[self.keys[i]] = i
+                return i
+
+        def running(self, node, key):
+                return (id(node), key) in self.slots
+
+        #Stops the tween of the node under the given key, if there is one, leaving the attribute as it is.
+        def cancel(self, node, key):
+                i = self.slots.pop((id(node), key), None)
+                if i is not None:
+                        self.release(i)
+
+        def release(self, i):
+                self.active[i] = False
+                self.nodes[i] = None
+                self.callbacks[i] = None
+                self.keys[i] = None
+                self.free.append(i)
+
+        #Stops every tween.
+        def clear(self):
+                for i in list(self.slots.values()):
+                        self.release(i)
+                self.slots.clear()
+
+        #Works out the values of all tweens at time t, writes those which have changed to the nodes, and ends
+        #the tweens which have finished.
+        def update(self, t):
+                if not self.slots:
+                        return
+                rows = numpy.nonzero(self.active)[0]
+                times = self.times[rows]
+                values = self.values[rows]
+                elapsed = numpy.minimum(t - self.start[rows], times[:, -1])
+                #The keyframe each tween has last passed, and how far it is along to the next.
+                passed = (times[:, 1:] <= elapsed[:, None]).sum(axis=1)
+                j = numpy.minimum(passed, self.max_keys - 1)
+                k = numpy.minimum(passed + 1, self.max_keys - 1)
+                r = numpy.arange(len(rows))
+                t_0 = times[r, j]
+                t_1 = times[r, k]
+                span = t_1 - t_0
+                f = numpy.where(span > 0, (elapsed - t_0) / numpy.where(span > 0, span, 1), 1.0)
+                f = numpy.clip(f, 0, 1)
+                current = values[r, j] + (values[r, k] - values[r, j]) * f
+                finished = (t - self.start[rows]) >= times[:, -1]
+
+                changed = current != self.last[rows]
+                self.last[rows] = current
+                nodes = self.nodes
+                attributes = self.attributes
+                for i, value in zip(rows[changed].tolist(), current[changed].tolist()):
+                        setattr(nodes[i], attributes[i], value)
+
+                #The finished tweens are all ended before any callback is made, as a callback may start new ones.
+                callbacks = []
+                for i in rows[finished].tolist():
+                        if self.callbacks[i] is not None:
+                                callbacks.append(self.callbacks[i])
+                        del self.slots[self.keys[i]]
+                        self.release(i)
+                for done in callbacks:
+                        done()